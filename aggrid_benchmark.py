@@ -0,0 +1,384 @@
+"""Headless benchmarks for the grid classes across data sizes
+
+Runs the option building, View_Class construction, full table display and submit
+paths with Streamlit and AgGrid stubbed out, on synthetic frames.
+
+    python aggrid_benchmark.py --rows 1000 100000 --cols 5 50 --save baseline.json
+    python aggrid_benchmark.py --compare baseline.json
+    python aggrid_benchmark.py --stress 32
+"""
+import argparse
+import collections
+import contextlib
+import datetime
+import gc
+import json
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from st_aggrid.shared import JsCodeEncoder
+
+import aggrid_classes
+from aggrid_classes import Aggrid_Class, Edit_Class, View_Class
+from aggrid_edits import diff_edited_rows
+from aggrid_store import Memory_Store, Row_Version_Conflict, Versioned_Store
+
+DEFAULT_ROWS = [1_000, 100_000, 1_000_000]
+DEFAULT_COLS = [5, 50]
+# Largest rows x columns frame generated unless --max-cells says otherwise
+DEFAULT_MAX_CELLS = 50_000_000
+
+
+class Stub_Rerun(Exception):
+    """Raised by the stubbed st.rerun to stop the benchmarked code path like Streamlit does"""
+
+
+class Stub_Session_State(dict):
+    """Dict with attribute access, standing in for st.session_state"""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+
+class Stub_Element:
+    """No-op Streamlit element usable as a context manager and as a container"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: Stub_Element()
+
+
+class Stub_Streamlit:
+    """Minimal stand-in for the streamlit module, widgets report no interaction"""
+
+    def __init__(self):
+        self.session_state = Stub_Session_State()
+
+    def columns(self, spec, **kwargs):
+        return [Stub_Element() for _ in range(spec if isinstance(spec, int) else len(spec))]
+
+    def tabs(self, labels):
+        return [Stub_Element() for _ in labels]
+
+    def button(self, *args, **kwargs):
+        return False
+
+    def selectbox(self, label, options, *args, **kwargs):
+        return options[0] if options else None
+
+    def rerun(self):
+        raise Stub_Rerun()
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: Stub_Element()
+
+
+class Stub_AgGrid:
+    """Stand-in for AgGrid that serializes what the real component would send and records its size"""
+
+    def __init__(self):
+        self.payload_bytes = 0
+        self.options_bytes = 0
+
+    def __call__(self, data=None, gridOptions=None, **kwargs):
+        grid_options = dict(gridOptions or {})
+        if "rowData" not in grid_options and isinstance(data, pd.DataFrame):
+            # Same work as st_aggrid: copy the frame and serialize it as records
+            data_parameter = data.copy()
+            data_parameter["__pandas_index"] = [str(i) for i in range(data_parameter.shape[0])]
+            grid_options["rowData"] = json.loads(data_parameter.to_json(orient="records", date_format="iso"))
+        self.payload_bytes += len(json.dumps(grid_options, cls=JsCodeEncoder))
+        # The options alone, without the rows, as sent on every render
+        self.options_bytes += len(json.dumps(
+            {name: value for name, value in grid_options.items() if name != "rowData"}, cls=JsCodeEncoder
+        ))
+        return {"selected_rows": [], "data": data}
+
+
+@contextlib.contextmanager
+def stubbed_streamlit():
+    """Swap Streamlit and AgGrid in aggrid_classes for stubs for the duration of a with block"""
+    original_st, original_aggrid = aggrid_classes.st, aggrid_classes.AgGrid
+    stub_st, stub_aggrid = Stub_Streamlit(), Stub_AgGrid()
+    aggrid_classes.st, aggrid_classes.AgGrid = stub_st, stub_aggrid
+    try:
+        yield stub_st, stub_aggrid
+    finally:
+        aggrid_classes.st, aggrid_classes.AgGrid = original_st, original_aggrid
+
+
+def make_frame(rows, cols, seed=0):
+    """Build a synthetic frame cycling through int, float, low-cardinality text and datetime columns"""
+    rng = np.random.default_rng(seed)
+    categories = np.array(["New York", "London", "Tokyo", "Paris", "Sydney", "Cairo", "Lima", "Oslo"])
+    data = {}
+    for i in range(cols):
+        kind = i % 4
+        if kind == 0:
+            data[f"int_{i}"] = rng.integers(0, 100_000, rows)
+        elif kind == 1:
+            data[f"float_{i}"] = rng.random(rows) * 1000
+        elif kind == 2:
+            data[f"text_{i}"] = categories[rng.integers(0, len(categories), rows)].astype(object)
+        else:
+            data[f"date_{i}"] = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D")
+    df = pd.DataFrame(data)
+    df["__row_id__"] = np.arange(rows)
+    return df
+
+
+def make_edits(df, seed=0):
+    """Return an edited copy of 1% of the rows (1 to 1,000), with the first numeric column changed"""
+    rng = np.random.default_rng(seed)
+    count = min(max(len(df) // 100, 1), 1000)
+    edited = df.iloc[np.sort(rng.choice(len(df), count, replace=False))].copy()
+    target = next((col for col in df.columns if col != "__row_id__" and df[col].dtype.kind in "if"), None)
+    if target is not None:
+        edited[target] = edited[target] + 1
+    return edited.reset_index(drop=True)
+
+
+def case_options_cold(df, stub_st, stub_aggrid):
+    Aggrid_Class.options_cache.clear()
+    Aggrid_Class().configure_base_grid_options(df)
+
+
+def case_options_warm(df, stub_st, stub_aggrid):
+    Aggrid_Class().configure_base_grid_options(df)
+
+
+def case_view_init(df, stub_st, stub_aggrid):
+    View_Class(df=df)
+
+
+def case_view_display(df, stub_st, stub_aggrid):
+    View_Class(df=df, key="benchmark_view").display_view_table()
+
+
+def case_display_full_table(df, stub_st, stub_aggrid):
+    editor = Edit_Class()
+    editor.display_full_table()
+
+
+def case_submit_changes(df, stub_st, stub_aggrid, edited=None):
+    editor = Edit_Class()
+    try:
+        editor.submit_changes(edited)
+    except Stub_Rerun:
+        pass
+
+
+CASES = {
+    "options_cold": case_options_cold,
+    "options_warm": case_options_warm,
+    "view_init": case_view_init,
+    "view_display": case_view_display,
+    "display_full_table": case_display_full_table,
+    "submit_changes": case_submit_changes,
+}
+
+
+def run_case(name, df, repeat=3):
+    """Run one case and return its best wall time, peak traced memory and payload size"""
+    func = CASES[name]
+    edited = make_edits(df) if name == "submit_changes" else None
+
+    def prepare(stub_st, stub_aggrid):
+        # Each run starts from a fresh session holding the frame, as a new browser session would
+        stub_st.session_state.clear()
+        Memory_Store(stub_st.session_state).initialize(df)
+        stub_aggrid.payload_bytes = 0
+        stub_aggrid.options_bytes = 0
+
+    def run_once(stub_st, stub_aggrid):
+        kwargs = {"edited": edited} if edited is not None else {}
+        started = time.perf_counter()
+        func(df, stub_st, stub_aggrid, **kwargs)
+        return time.perf_counter() - started
+
+    with stubbed_streamlit() as (stub_st, stub_aggrid):
+        timings = []
+        for _ in range(repeat):
+            prepare(stub_st, stub_aggrid)
+            timings.append(run_once(stub_st, stub_aggrid))
+        payload_bytes = stub_aggrid.payload_bytes
+        options_bytes = stub_aggrid.options_bytes
+
+        # Memory is measured on a separate run, tracing slows the timed ones down
+        prepare(stub_st, stub_aggrid)
+        gc.collect()
+        tracemalloc.start()
+        run_once(stub_st, stub_aggrid)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        "case": name,
+        "rows": len(df),
+        "cols": len(df.columns) - 1,
+        "seconds": min(timings),
+        "peak_mb": peak / 2**20,
+        "payload_bytes": payload_bytes,
+        "options_bytes": options_bytes,
+    }
+
+
+def run_suite(rows_list, cols_list, cases=None, repeat=3, max_cells=DEFAULT_MAX_CELLS, log=print):
+    """Run every case over every frame size and return the results document"""
+    results = []
+    for rows in rows_list:
+        for cols in cols_list:
+            if rows * cols > max_cells:
+                log(f"skip {rows:>10,} x {cols:<5} ({rows * cols:,} cells > --max-cells {max_cells:,})")
+                continue
+            df = make_frame(rows, cols)
+            for name in cases or CASES:
+                result = run_case(name, df, repeat=repeat)
+                results.append(result)
+                log(f"{name:<20} {rows:>10,} x {cols:<5} {result['seconds'] * 1000:>10.1f} ms "
+                    f"{result['peak_mb']:>9.1f} MB {result['payload_bytes']:>14,} B "
+                    f"{result['options_bytes']:>10,} B options")
+            del df
+            gc.collect()
+
+    return {
+        "meta": {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=1.2, log=print):
+    """Compare results against a baseline document and return the cases slower than threshold x baseline"""
+    previous = {(r["case"], r["rows"], r["cols"]): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get((result["case"], result["rows"], result["cols"]))
+        if before is None:
+            continue
+        ratio = result["seconds"] / before["seconds"] if before["seconds"] else float("inf")
+        memory_ratio = result["peak_mb"] / before["peak_mb"] if before["peak_mb"] else float("inf")
+        flag = "REGRESSION" if ratio > threshold else ""
+        log(f"{result['case']:<20} {result['rows']:>10,} x {result['cols']:<5} "
+            f"time x{ratio:>6.2f}  memory x{memory_ratio:>6.2f}  {flag}")
+        if ratio > threshold:
+            regressions.append(result)
+    return regressions
+
+
+def run_stress(writers=16, submits=50, rows=10_000, rows_per_submit=10, hot_rows=20, hot_rows_per_submit=2,
+               stripes=64, log=print):
+    """Run concurrent writers against one Versioned_Store and return whether every committed update was kept"""
+    df = pd.DataFrame({"counter": np.zeros(rows, dtype=np.int64), "writer": np.full(rows, -1)})
+    df["__row_id__"] = np.arange(rows)
+    ok = True
+
+    # Disjoint: every writer owns a block of rows, hot: every writer competes for the same few rows
+    for phase in ("disjoint", "hot"):
+        store = Versioned_Store(stripes=stripes)
+        store.initialize(df)
+        increments = collections.Counter()
+        conflicts = collections.Counter()
+        counter_lock = threading.Lock()
+
+        def writer(writer_id):
+            rng = np.random.default_rng(writer_id)
+            if phase == "disjoint":
+                block = rows // writers
+                candidates = np.arange(writer_id * block, (writer_id + 1) * block)
+                per_submit = rows_per_submit
+            else:
+                candidates = np.arange(min(hot_rows, rows))
+                per_submit = hot_rows_per_submit
+            for _ in range(submits):
+                row_ids = sorted(rng.choice(candidates, min(per_submit, len(candidates)), replace=False).tolist())
+                # Optimistic read-modify-write, retried until it commits
+                while True:
+                    versions = store.row_versions(row_ids)
+                    current = store.read_row_ids(row_ids)
+                    edited = current.copy()
+                    edited["counter"] += 1
+                    edited["writer"] = writer_id
+                    try:
+                        store.apply_diff(diff_edited_rows(current, edited), expected_versions=versions)
+                        break
+                    except Row_Version_Conflict:
+                        with counter_lock:
+                            conflicts[writer_id] += 1
+                with counter_lock:
+                    increments.update(row_ids)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=writers) as pool:
+            list(pool.map(writer, range(writers)))
+        elapsed = time.perf_counter() - started
+
+        counters = store.read_column("counter")
+        expected = pd.Series(increments, dtype=np.int64).reindex(counters.index, fill_value=0)
+        lost = int((counters != expected).sum())
+        versions = pd.Series(store.row_versions(counters.index.tolist()))
+        phase_ok = lost == 0 and (versions.to_numpy() == counters.to_numpy()).all()
+        ok = ok and phase_ok
+        log(f"stress {phase:<9} {writers} writers x {submits} submits: {writers * submits / elapsed:>9,.0f} commits/s, "
+            f"{sum(conflicts.values()):,} conflicts retried, {lost} rows with lost updates "
+            f"{'OK' if phase_ok else 'FAILED'}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--cols", type=int, nargs="+", default=DEFAULT_COLS)
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-cells", type=int, default=DEFAULT_MAX_CELLS)
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare the results against this baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="slowdown ratio reported as a regression (default 1.2)")
+    parser.add_argument("--stress", type=int, metavar="WRITERS",
+                        help="run this many concurrent writers against a versioned store instead of the suite")
+    parser.add_argument("--stress-submits", type=int, default=50,
+                        help="submits per writer in a stress run (default 50)")
+    args = parser.parse_args(argv)
+
+    if args.stress:
+        return 0 if run_stress(args.stress, args.stress_submits) else 1
+
+    current = run_suite(args.rows, args.cols, args.cases, args.repeat, args.max_cells)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(current, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(current, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
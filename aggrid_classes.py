@@ -1,19 +1,141 @@
+import math
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
 import streamlit as st
 import pandas as pd
 from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode, DataReturnMode, JsCode
+from aggrid_datasource import Row_Block_Cache, as_row_source, serialize_rows
+from aggrid_query import Query_Engine, Query_Source, model_key
+from aggrid_payload import (
+    CELL_CHANGE_EVENTS_JS, COLUMNAR_DECODER_JS, GROUP_OPEN_JS, GROUP_PATH_JS, PAYLOAD_FORMATS, ROW_ID_JS,
+    encode_columnar
+)
+from aggrid_edits import (
+    BULK_OPERATIONS, COLUMN_OPERATORS, Edit_Conflict, Edit_Journal, bulk_edit_diff, diff_cell_changes,
+    diff_edited_rows, is_number_dtype
+)
+from aggrid_store import Memory_Store, Row_Version_Conflict
+from aggrid_metrics import Grid_Timer, log_timing_record
+from aggrid_file_sources import open_file_source
+from aggrid_loader import Background_Load, Page_Prefetcher
+from aggrid_dtypes import compact_dtypes
+from aggrid_groups import AGGREGATIONS, Group_Cache, group_row_id
+from aggrid_export import EXPORT_FORMATS, export_rows
+
+class Grid_Options_Cache:
+    """Process-wide LRU cache of built grid options, keyed by schema and style settings"""
+    
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, cache_key):
+        """Return the cached options for a key, or None on a miss"""
+        with self._lock:
+            grid_options = self._entries.get(cache_key)
+            if grid_options is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+            return grid_options
+    
+    def put(self, cache_key, grid_options):
+        """Store built options, evicting the least recently used entries beyond max_entries"""
+        with self._lock:
+            self._entries[cache_key] = grid_options
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop every cached entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    def stats(self):
+        """Return hit/miss counters and the current size of the cache"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+grid_options_cache = Grid_Options_Cache()
 
 class Aggrid_Class:
     """Base class for AG-Grid configuration with all common options and styling"""
     
+    # Shared across every grid in the process, set to None to always rebuild options
+    options_cache = grid_options_cache
+    
     def __init__(self, theme='alpine', height=450, page_size=20, cell_color='#008080', 
-                 font_size='16px', font_family='Arial, sans-serif'):
+                 font_size='16px', font_family='Arial, sans-serif', row_model='clientSide',
+                 cache_block_size=100, max_blocks_in_cache=10, zero_copy=False, grid_payload='rows',
+                 payload_compression=None, show_payload_stats=False, debug_timings=False, log_timings=False,
+                 selection_return='rows', edit_return='rows', edit_debounce_ms=300, column_styles=None,
+                 wide_column_threshold=50, wide_column_width=150, compact_dtypes=False, max_category_ratio=0.5,
+                 show_export=False, export_dir=None, export_chunk_rows=100_000, export_download_max_bytes=200 * 2**20):
+        if row_model not in ('clientSide', 'serverSide'):
+            raise ValueError(f"Unsupported row_model '{row_model}'. Use 'clientSide' or 'serverSide'.")
+        if grid_payload not in PAYLOAD_FORMATS:
+            raise ValueError(f"Unsupported grid_payload '{grid_payload}'. Use 'rows' or 'columnar'.")
+        if selection_return not in ('rows', 'ids'):
+            raise ValueError(f"Unsupported selection_return '{selection_return}'. Use 'rows' or 'ids'.")
+        if edit_return not in ('rows', 'events'):
+            raise ValueError(f"Unsupported edit_return '{edit_return}'. Use 'rows' or 'events'.")
+
         self.theme = theme
         self.height = height
         self.page_size = page_size
         self.cell_color = cell_color
         self.font_size = font_size
         self.font_family = font_family
+        # 'clientSide' sends the whole frame and lets the browser paginate,
+        # 'serverSide' slices only the current page out of the frame and sends that
+        self.row_model = row_model
+        self.cache_block_size = cache_block_size
+        self.max_blocks_in_cache = max_blocks_in_cache
+        # Hand the grid the frame itself instead of a copy, row identity comes from the index
+        self.zero_copy = zero_copy
+        # 'columnar' sends each column once (optionally gzip-compressed) and rebuilds rows in the browser
+        self.grid_payload = grid_payload
+        self.payload_compression = payload_compression
+        self.show_payload_stats = show_payload_stats
+        # Per-phase timings of every render and submit, optionally shown under the grid or logged as JSON
+        self.debug_timings = debug_timings
+        self.log_timings = log_timings
+        # 'ids' reads only the selected __row_id__ values back and looks the rows up on the server
+        self.selection_return = selection_return
+        # 'events' reads only (row_id, column, old, new) cell changes back from the editing grid,
+        # sent at most once per edit_debounce_ms and kept in a pending-changes buffer until submit
+        self.edit_return = edit_return
+        self.edit_debounce_ms = edit_debounce_ms
+        # Cell style overrides per column name, only the keys that differ from the shared style are sent
+        self.column_styles = column_styles or {}
+        # Frames with more columns keep fixed column widths so the grid only renders the visible ones
+        self.wide_column_threshold = wide_column_threshold
+        self.wide_column_width = wide_column_width
+        # Store repeated strings as categoricals and numbers in the smallest lossless dtype on ingestion
+        self.compact_dtypes = compact_dtypes
+        self.max_category_ratio = max_category_ratio
+        # Exports write the grid's sorted and filtered rows to a file under export_dir one chunk at a time,
+        # files up to export_download_max_bytes are also offered for download
+        self.show_export = show_export
+        self.export_dir = export_dir or os.path.join(tempfile.gettempdir(), "aggrid_exports")
+        self.export_chunk_rows = export_chunk_rows
+        self.export_download_max_bytes = export_download_max_bytes
         self.page_size_options = [5, 10, 20, 50, 100]
+        # Grids whose key changes on every rerun keep their per-render stats and timings here instead of
+        # in session state, where each rerun would leave another entry behind
+        self.unstable_keys = set()
+        self.render_state = {}
         
         # Ensure page_size is in the options
         if self.page_size not in self.page_size_options:
@@ -21,7 +143,29 @@ class Aggrid_Class:
             self.page_size_options.sort()
     
     def configure_base_grid_options(self, df, editable=False, selection_mode=None, use_checkbox=False):
-        """Configure base grid options with common settings"""
+        """Configure base grid options with common settings, reusing cached options for an unchanged schema"""
+        if self.options_cache is None:
+            return self.build_grid_options(df, editable, selection_mode, use_checkbox)
+
+        cache_key = self.grid_options_cache_key(df, editable, selection_mode, use_checkbox)
+        grid_options = self.options_cache.get(cache_key)
+        if grid_options is None:
+            grid_options = self.build_grid_options(df, editable, selection_mode, use_checkbox)
+            self.options_cache.put(cache_key, grid_options)
+
+        # Shallow copy so AgGrid can set rowData and friends without touching the cached entry
+        return dict(grid_options)
+    
+    def grid_options_cache_key(self, df, editable=False, selection_mode=None, use_checkbox=False):
+        """Build the options cache key from column names, dtypes and every style/behaviour setting"""
+        schema = tuple((col, str(dtype)) for col, dtype in df.dtypes.items())
+        style = (self.theme, self.font_size, self.font_family, self.cell_color,
+                 self.page_size, tuple(self.page_size_options), self.row_model,
+                 model_key(self.column_styles), self.wide_column_threshold, self.wide_column_width)
+        return (schema, style, editable, selection_mode, use_checkbox)
+    
+    def build_grid_options(self, df, editable=False, selection_mode=None, use_checkbox=False):
+        """Build grid options from scratch for a frame"""
         gb = GridOptionsBuilder.from_dataframe(df)
         
         # Configure selection if needed
@@ -31,49 +175,332 @@ class Aggrid_Class:
         # Hide row ID column
         gb.configure_column("__row_id__", hide=True)
         
-        # Configure columns with styling
-        for col in df.columns:
-            if col != "__row_id__":
-                gb.configure_column(
-                    col,
-                    editable=editable,
-                    cellStyle={
-                        'textAlign': 'left', 
-                        'fontSize': self.font_size, 
-                        'fontFamily': self.font_family, 
-                        'color': self.cell_color
-                    },
-                    headerClass="left-header"
-                )
+        # The shared style is sent once in defaultColDef, columns only carry the styles that differ from it
+        cell_style = self.cell_style()
+        for col, style in self.column_styles.items():
+            overrides = {name: value for name, value in style.items() if cell_style.get(name) != value}
+            if overrides and col in df.columns and col != "__row_id__":
+                # A column's cellStyle replaces the default one, so it carries the merged style
+                gb.configure_column(col, cellStyle={**cell_style, **overrides})
         
         # Configure pagination and other grid options
-        gb.configure_grid_options(
-            domLayout='normal', 
-            pagination=True, 
-            paginationPageSize=self.page_size,
-            paginationPageSizeSelector=self.page_size_options
-        )
+        if self.row_model == 'serverSide':
+            # Pages are sliced on the server, the grid only ever holds one of them
+            gb.configure_grid_options(domLayout='normal', pagination=False)
+        else:
+            gb.configure_grid_options(
+                domLayout='normal', 
+                pagination=True, 
+                paginationPageSize=self.page_size,
+                paginationPageSizeSelector=self.page_size_options
+            )
         gb.configure_side_bar()
         
         grid_options = gb.build()
         
         # Set default column definitions
         grid_options["defaultColDef"] = {
-            "flex": 1, 
             "minWidth": 100, 
             "resizable": True, 
             "filter": True, 
             "sortable": True,
             "editable": editable,
             "headerClass": "left-header", 
-            "cellStyle": {'textAlign': 'left'}
+            "cellStyle": cell_style
         }
+        if self.fits_columns(df):
+            grid_options["defaultColDef"]["flex"] = 1
+        else:
+            # Fixed widths leave column virtualisation effective, only the columns in view are rendered
+            grid_options["defaultColDef"]["width"] = self.wide_column_width
+            grid_options.pop("autoSizeStrategy", None)
         
         if editable:
             grid_options["singleClickEdit"] = True
         
         return grid_options
     
+    def cell_style(self):
+        """Return the cell style shared by every column"""
+        return {
+            'textAlign': 'left', 
+            'fontSize': self.font_size, 
+            'fontFamily': self.font_family, 
+            'color': self.cell_color
+        }
+    
+    def fits_columns(self, df):
+        """Whether the columns of a frame are stretched to fit the grid width"""
+        return len(df.columns) <= self.wide_column_threshold
+    
+    @property
+    def prefills_row_data(self):
+        """Whether rows are put into the grid options here rather than serialized by AgGrid"""
+        return self.zero_copy or self.grid_payload == 'columnar' or self.selection_return == 'ids'
+    
+    def prepare_grid_data(self, df, grid_options, key):
+        """Return the data to pass to AgGrid, encoding rows straight into the options when configured"""
+        if self.grid_payload == 'columnar':
+            payload, stats = encode_columnar(df, compression=self.payload_compression)
+            grid_options["rowData"] = []
+            grid_options["context"] = {**grid_options.get("context", {}), "columnarRowData": payload}
+            grid_options["onGridReady"] = COLUMNAR_DECODER_JS
+            grid_options["onRowDataUpdated"] = COLUMNAR_DECODER_JS
+            grid_options["getRowId"] = ROW_ID_JS
+            self.grid_state(key)[f"{key}__payload_stats"] = stats
+        elif self.zero_copy or self.selection_return == 'ids':
+            # AgGrid copies any frame it has to serialize itself, pre-filled rowData skips that copy.
+            # Grid row ids are then the __row_id__ values, which is what id-only selection reads back.
+            grid_options["rowData"] = serialize_rows(df)
+        return df
+    
+    def get_payload_stats(self, key):
+        """Return the size and encode time of the last payload encoded for a grid, if any"""
+        return self.grid_state(key).get(f"{key}__payload_stats")
+    
+    def display_payload_stats(self, key):
+        """Show the payload size of the last render under a grid when enabled"""
+        stats = self.get_payload_stats(key)
+        if not (self.show_payload_stats and stats):
+            return
+        saved_pct = 100 * stats["saved_bytes"] / stats["row_json_bytes"] if stats["row_json_bytes"] else 0
+        encoding = stats["format"] + (f"+{stats['compression']}" if stats["compression"] else "")
+        st.caption(
+            f"Grid payload: {stats['payload_bytes']:,} bytes {encoding} vs {stats['row_json_bytes']:,} bytes "
+            f"as row JSON ({saved_pct:.0f}% smaller), encoded in {stats['encode_ms']:.1f} ms"
+        )
+    
+    def compact_frame(self, df, key):
+        """Compact a grid's frame on ingestion when enabled and keep its memory report, returning the frame to use"""
+        if not self.compact_dtypes:
+            return df
+        with self.time_phase(key, "compact"):
+            df, report = compact_dtypes(df, self.max_category_ratio)
+        self.grid_state(key)[f"{key}__memory_report"] = report
+        return df
+    
+    def get_memory_report(self, key):
+        """Return the memory before and after compaction of a grid's frame, if it was compacted"""
+        return self.grid_state(key).get(f"{key}__memory_report")
+    
+    def display_memory_report(self, key):
+        """Show the memory saved by compaction under a grid when enabled"""
+        report = self.get_memory_report(key)
+        if not (self.compact_dtypes and report):
+            return
+        saved_pct = 100 * (1 - report["after_bytes"] / report["before_bytes"]) if report["before_bytes"] else 0
+        changes = ", ".join(f"{col} {change['from']}→{change['to']}" for col, change in report["columns"].items())
+        st.caption(
+            f"Grid data memory: {report['after_bytes']:,} bytes vs {report['before_bytes']:,} bytes "
+            f"before compaction ({saved_pct:.0f}% smaller)" + (f": {changes}" if changes else "")
+        )
+    
+    def get_row_block_cache(self, source, key):
+        """Return the row block cache serving a grid, rebuilding it when the data or cache settings change"""
+        source = as_row_source(source)
+        cache_key = f"{key}__blocks"
+        block_cache = st.session_state.get(cache_key)
+        if (block_cache is None
+                or not block_cache.serves(source)
+                or block_cache.block_size != self.cache_block_size
+                or block_cache.max_blocks != self.max_blocks_in_cache):
+            block_cache = Row_Block_Cache(
+                source,
+                block_size=self.cache_block_size,
+                max_blocks=self.max_blocks_in_cache
+            )
+            st.session_state[cache_key] = block_cache
+        return block_cache
+    
+    def get_grid_query(self, key):
+        """Return the (sort_model, filter_model) a grid reported in its last returned state"""
+        grid_value = st.session_state.get(key)
+        grid_state = (grid_value.get("gridState") if isinstance(grid_value, dict) else None) or {}
+        sort_model = (grid_state.get("sort") or {}).get("sortModel") or []
+        filter_model = (grid_state.get("filter") or {}).get("filterModel") or {}
+        return sort_model, filter_model
+    
+    def apply_grid_query(self, source, key):
+        """Sort and filter a row source on the server with the grid's current sort and filter models"""
+        sort_model, filter_model = self.get_grid_query(key)
+        query_key = (model_key(sort_model), model_key(filter_model))
+
+        # A new sort or filter starts again from the first page
+        if st.session_state.get(f"{key}__query_key") != query_key:
+            st.session_state[f"{key}__query_key"] = query_key
+            st.session_state[f"{key}__page"] = 0
+        return self.get_query_source(source, key)
+    
+    def get_query_source(self, source, key):
+        """Return a row source presenting a source's rows with the grid's current sort and filter applied"""
+        source = as_row_source(source)
+        sort_model, filter_model = self.get_grid_query(key)
+        query_key = (model_key(sort_model), model_key(filter_model))
+        if not sort_model and not filter_model:
+            return source
+
+        # Orders and masks are kept across reruns and pages until the data changes
+        engine = st.session_state.get(f"{key}__query")
+        if engine is None or not engine.serves(source):
+            engine = Query_Engine(source)
+            st.session_state[f"{key}__query"] = engine
+        positions = engine.positions(sort_model, filter_model)
+        skipped = engine.skipped(filter_model)
+        if skipped:
+            st.session_state.message_type = "warning"
+            st.session_state.message_content = "⚠️ Filters ignored on the server: " + "; ".join(
+                f"{col}: {reason}" for col, reason in skipped.items()
+            )
+        return Query_Source(source, positions, query_key)
+    
+    def export_grid_rows(self, data, key, fmt, target, columns=None, chunk_rows=None, progress=None):
+        """Write a grid's rows with its current sort and filter to a path or binary file, returning the export stats"""
+        with self.time_phase(key, "export"):
+            stats = export_rows(
+                self.get_query_source(data, key), fmt, target, columns,
+                chunk_rows=chunk_rows or self.export_chunk_rows, progress=progress
+            )
+        self.finish_timings(key, "export", **stats)
+        return stats
+    
+    def display_export_controls(self, data, key):
+        """Display an export expander writing the grid's sorted and filtered rows to a file on the server"""
+        if not self.show_export:
+            return
+        result_key = f"{key}__export_result"
+        with st.expander("Export"):
+            col1, col2 = st.columns([1, 3])
+            with col1:
+                fmt = st.selectbox("Format", EXPORT_FORMATS, key=f"{key}__export_format")
+            with col2:
+                st.caption("Every row matching the grid's current filter is exported, in its current sort order.")
+                export_clicked = st.button("Export", key=f"{key}__export")
+
+            if export_clicked:
+                os.makedirs(self.export_dir, exist_ok=True)
+                path = os.path.join(
+                    self.export_dir, f"{key}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}.{fmt}"
+                )
+                progress_bar = st.progress(0.0, text="Exporting…")
+
+                def show_progress(rows, total_rows, bytes_written):
+                    progress_bar.progress(
+                        rows / total_rows if total_rows else 1.0,
+                        text=f"Exported {rows:,} of {total_rows:,} rows ({bytes_written:,} bytes)"
+                    )
+
+                try:
+                    stats = self.export_grid_rows(data, key, fmt, path, progress=show_progress)
+                except (ImportError, ValueError, OSError) as ex:
+                    st.session_state.message_type = "error"
+                    st.session_state.message_content = f"❌ Export failed: {ex}"
+                else:
+                    st.session_state[result_key] = {"path": path, **stats}
+                    st.session_state.message_type = "success"
+                    st.session_state.message_content = (
+                        f"✅ Exported {stats['rows']:,} row(s) to {fmt} "
+                        f"({stats['bytes']:,} bytes in {stats['seconds']:.1f} s)."
+                    )
+
+            result = st.session_state.get(result_key)
+            if result and os.path.exists(result["path"]):
+                st.caption(f"Last export: {result['path']} ({result['rows']:,} rows, {result['bytes']:,} bytes)")
+                if result["bytes"] <= self.export_download_max_bytes:
+                    with open(result["path"], "rb") as f:
+                        st.download_button(
+                            "Download", f, file_name=os.path.basename(result["path"]), key=f"{key}__download"
+                        )
+    
+    def get_page_state(self, key, total_rows):
+        """Return the current (page, page_size) of a server-side grid, clamped to the row count"""
+        page_key = f"{key}__page"
+        size_key = f"{key}__page_size"
+        if size_key not in st.session_state:
+            st.session_state[size_key] = self.page_size
+        if page_key not in st.session_state:
+            st.session_state[page_key] = 0
+
+        page_size = st.session_state[size_key]
+        page_count = max(1, math.ceil(total_rows / page_size))
+        page = min(max(st.session_state[page_key], 0), page_count - 1)
+        st.session_state[page_key] = page
+        return page, page_size
+    
+    def display_page_controls(self, key, page, page_size, total_rows):
+        """Display previous/next buttons, the row range and a page size selector under a server-side grid"""
+        page_key = f"{key}__page"
+        page_count = max(1, math.ceil(total_rows / page_size))
+        first_row = min(page * page_size + 1, total_rows)
+        last_row = min((page + 1) * page_size, total_rows)
+
+        def set_page(new_page):
+            st.session_state[page_key] = new_page
+
+        def reset_page():
+            st.session_state[page_key] = 0
+
+        col1, col2, col3, col4 = st.columns([1, 1, 3, 2])
+        with col1:
+            st.button("◀ Previous", key=f"{key}__previous", disabled=page == 0,
+                      on_click=set_page, args=(page - 1,))
+        with col2:
+            st.button("Next ▶", key=f"{key}__next", disabled=page >= page_count - 1,
+                      on_click=set_page, args=(page + 1,))
+        with col3:
+            st.caption(f"Rows {first_row}–{last_row} of {total_rows} (page {page + 1} of {page_count})")
+        with col4:
+            st.selectbox("Page size", self.page_size_options, key=f"{key}__page_size",
+                         on_change=reset_page, label_visibility="collapsed")
+    
+    def get_data_changes(self):
+        """Return this session's logged data changes, oldest first"""
+        return list(st.session_state.get("__data_changes__", []))
+    
+    def grid_state(self, key):
+        """Return where a grid's stats and timings are kept, session state unless its key changes on every rerun"""
+        return self.render_state if key in self.unstable_keys else st.session_state
+    
+    @property
+    def timer(self):
+        """Timings recorder for this session's grids"""
+        return Grid_Timer(st.session_state)
+    
+    def grid_timer(self, key):
+        """Timings recorder holding one grid's timings"""
+        return Grid_Timer(self.grid_state(key))
+    
+    def time_phase(self, key, name):
+        """Context manager timing one phase of a grid's current render or submit"""
+        return self.grid_timer(key).phase(key, name)
+    
+    def finish_timings(self, key, event, **details):
+        """Close a grid's timing record, log it and show it under the grid when enabled"""
+        payload_stats = self.get_payload_stats(key)
+        if event == "render" and payload_stats:
+            details.setdefault("payload_bytes", payload_stats["payload_bytes"])
+        record = self.grid_timer(key).finish(key, event, **details)
+        if self.log_timings:
+            log_timing_record(record)
+        if self.debug_timings and event == "render":
+            self.display_timings(key)
+        return record
+    
+    def get_grid_timings(self, key=None):
+        """Return the recorded timings of one grid, or of every grid in this session"""
+        return self.timer.history(key) if key is None else self.grid_timer(key).history(key)
+    
+    def display_timings(self, key, limit=5):
+        """Show the most recent timing records of a grid in a debug expander"""
+        records = self.grid_timer(key).history(key)[-limit:]
+        with st.expander(f"⏱️ Grid timings: {key}"):
+            st.dataframe(
+                pd.DataFrame([
+                    {"event": record["event"], "total_ms": record["total_ms"], **record["phases"]}
+                    for record in reversed(records)
+                ]),
+                hide_index=True
+            )
+    
     def display_message(self, message_type=None, message_content="", position="bottom"):
         """Display messages with proper positioning"""
         if message_type and message_content:
@@ -110,13 +537,17 @@ class Aggrid_Class:
 class Edit_Class(Aggrid_Class):
     """Class for editable AG-Grid tables, inherited from Aggrid_Class"""
     
-    def __init__(self, **kwargs):
+    def __init__(self, store=None, journal_max_entries=50, journal_max_bytes=16 * 2**20, **kwargs):
         super().__init__(**kwargs)
+        # Where the editable data lives, defaults to a per-session in-memory frame
+        self.store = store if store is not None else Memory_Store(st.session_state)
+        self.journal_max_entries = journal_max_entries
+        self.journal_max_bytes = journal_max_bytes
         self.initialize_session_state()
     
     def initialize_session_state(self):
         """Initialize session state variables for editing functionality"""
-        if "main_df" not in st.session_state:
+        if not self.store.is_initialized():
             df_initial = pd.DataFrame({
                 'Name': ['Alice', 'Bob', 'Charlie', 'Diana', 'Eve', 'Alice', 'Bob', 'Charlie', 'Diana', 'Eve'],
                 'Age': [25, 30, 35, 28, 32, 25, 30, 35, 28, 32],
@@ -125,57 +556,139 @@ class Edit_Class(Aggrid_Class):
                 'Department': ['IT', 'HR', 'Finance', 'IT', 'Marketing', 'IT', 'HR', 'Finance', 'IT', 'Marketing']
             })
             df_initial["__row_id__"] = df_initial.index
-            st.session_state.main_df = df_initial.copy()
+            # The store indexes by row id once so submits can locate edited rows directly
+            self.store.initialize(self.compact_frame(df_initial, "full_table_grid"))
 
         if "view_mode" not in st.session_state:
             st.session_state.view_mode = "full_table"
 
         if "selected_rows_for_editing" not in st.session_state:
             st.session_state.selected_rows_for_editing = pd.DataFrame()
+        if "editing_row_versions" not in st.session_state:
+            st.session_state.editing_row_versions = None
 
         if "message_type" not in st.session_state:
             st.session_state.message_type = None
         if "message_content" not in st.session_state:
             st.session_state.message_content = ""
+
+        if "edit_journal" not in st.session_state:
+            # Submitted edits as cell-level diffs, for undo/redo and the edit history
+            st.session_state.edit_journal = Edit_Journal(self.journal_max_entries, self.journal_max_bytes)
+    
+    @property
+    def journal(self):
+        """This session's journal of submitted edits"""
+        return st.session_state.edit_journal
+    
+    def record_data_change(self, before_token, diff):
+        """Log which rows and columns a write changed, so caches over the data can invalidate only those"""
+        changes = st.session_state.setdefault("__data_changes__", deque(maxlen=200))
+        changes.append({
+            "before": before_token,
+            "after": self.store.cache_token(),
+            "row_ids": diff.changed_row_ids,
+            "columns": diff.changed_columns(),
+        })
     
     def display_full_table(self):
         """Display the full table with row selection for editing"""
         st.header("Full Data Table: Select Rows to Edit")
         st.markdown("Use the checkboxes to select rows, then click 'Edit Selected Rows'.")
 
-        df_display_full = st.session_state.main_df.copy()
+        grid_key = "full_table_grid"
+        if self.row_model == 'serverSide':
+            # Only the current page is read from the store and sent, the options need just the schema
+            with self.time_phase(grid_key, "query"):
+                source = self.apply_grid_query(self.store, grid_key)
+                block_cache = self.get_row_block_cache(source, grid_key)
+                total_rows = block_cache.source.row_count()
+                page, page_size = self.get_page_state(grid_key, total_rows)
+                df_display_full = self.store.read_rows(0, 0)
+        else:
+            with self.time_phase(grid_key, "read_data"):
+                if self.zero_copy:
+                    # Read-only use of the stored frame, the grid never writes to it
+                    df_display_full = self.store.read_frame()
+                else:
+                    df_display_full = self.store.read_frame().copy()
 
         # Configure grid options for selection
-        grid_options_full = self.configure_base_grid_options(
-            df_display_full, 
-            editable=False, 
-            selection_mode="multiple", 
-            use_checkbox=True
-        )
+        with self.time_phase(grid_key, "build_options"):
+            grid_options_full = self.configure_base_grid_options(
+                df_display_full, 
+                editable=False, 
+                selection_mode="multiple", 
+                use_checkbox=True
+            )
+
+        with self.time_phase(grid_key, "serialize"):
+            if self.row_model == 'serverSide':
+                grid_options_full["rowData"] = block_cache.get_rows(page * page_size, (page + 1) * page_size)
+                grid_data_full = None
+            else:
+                grid_data_full = self.prepare_grid_data(df_display_full, grid_options_full, grid_key)
+
+        update_mode_full = GridUpdateMode.SELECTION_CHANGED
+        if self.row_model == 'serverSide' or self.show_export:
+            # Sort and filter changes come back to Python so they can be applied to every row
+            update_mode_full |= GridUpdateMode.SORTING_CHANGED | GridUpdateMode.FILTERING_CHANGED
 
         # Display the grid
-        grid_response_full = AgGrid(
-            df_display_full,
-            gridOptions=grid_options_full,
-            update_mode=GridUpdateMode.SELECTION_CHANGED,
-            data_return_mode=DataReturnMode.AS_INPUT,
-            height=self.height,
-            allow_unsafe_jscode=False,
-            enable_enterprise_modules=True,
-            theme=self.theme,
-            fit_columns_on_grid_load=True,
-            key="full_table_grid",
-            reload_data=False
-        )
+        with self.time_phase(grid_key, "aggrid"):
+            grid_response_full = AgGrid(
+                grid_data_full,
+                gridOptions=grid_options_full,
+                update_mode=update_mode_full,
+                data_return_mode=DataReturnMode.AS_INPUT,
+                height=self.height,
+                allow_unsafe_jscode=self.grid_payload == 'columnar',
+                try_to_convert_back_to_original_types=not self.prefills_row_data,
+                enable_enterprise_modules=True,
+                theme=self.theme,
+                fit_columns_on_grid_load=self.fits_columns(df_display_full),
+                key=grid_key,
+                reload_data=False
+            )
+
+        self.display_payload_stats(grid_key)
+        self.display_memory_report(grid_key)
+        if self.row_model == 'serverSide':
+            self.display_page_controls(grid_key, page, page_size, total_rows)
+        self.finish_timings(grid_key, "render")
+        self.display_export_controls(self.store, grid_key)
 
-        selected_rows_from_full_grid_list = grid_response_full.get("selected_rows", [])
+        if self.selection_return == 'ids':
+            selected_row_ids = self.get_selected_row_ids(grid_response_full)
+            bulk_row_ids = selected_row_ids
+        else:
+            selected_rows_from_full_grid_list = grid_response_full.get("selected_rows", [])
+            selected_frame = pd.DataFrame(selected_rows_from_full_grid_list)
+            bulk_row_ids = selected_frame["__row_id__"].tolist() if "__row_id__" in selected_frame.columns else []
+        
+        # Bulk edits change the selected rows in the store directly, without opening them in the editing grid
+        self.display_bulk_edit_controls(bulk_row_ids)
         
         st.markdown("---")
         if st.button("Edit Selected Rows"):
-            df_selected_for_check = pd.DataFrame(selected_rows_from_full_grid_list)
+            if self.selection_return == 'ids':
+                # Only ids came back from the grid, the rows themselves are read from the store
+                df_selected_for_check = self.store.read_row_ids(selected_row_ids)
+            else:
+                df_selected_for_check = pd.DataFrame(selected_rows_from_full_grid_list)
+
+            row_versions = getattr(self.store, "row_versions", None)
+            if row_versions is not None and not df_selected_for_check.empty:
+                # Rows and their versions are read together, so the submit can detect concurrent edits
+                selected_row_ids = df_selected_for_check["__row_id__"].tolist()
+                df_selected_for_check = self.store.read_row_ids(selected_row_ids)
+                st.session_state.editing_row_versions = row_versions(selected_row_ids)
+            else:
+                st.session_state.editing_row_versions = None
 
             if not df_selected_for_check.empty:
                 st.session_state.selected_rows_for_editing = df_selected_for_check
+                self.reset_pending_changes("selected_table_editing_grid")
                 st.session_state.view_mode = "selected_table_editing"
                 st.session_state.message_type = "info"
                 st.session_state.message_content = f"✏️ Editing {len(df_selected_for_check)} selected row(s)."
@@ -184,39 +697,127 @@ class Edit_Class(Aggrid_Class):
                 st.session_state.message_type = "warning"
                 st.session_state.message_content = "⚠️ No rows selected. Please select rows to edit."
                 st.rerun()
+
+        self.display_journal_controls()
         
         # Show messages at bottom
         self.show_bottom_message()
     
+    def display_journal_controls(self):
+        """Display undo/redo buttons and the edit history of this session"""
+        journal = self.journal
+        col1, col2, col3 = st.columns([1, 1, 4])
+        with col1:
+            undo_clicked = st.button("↩️ Undo", key="edit_journal__undo", disabled=not journal.can_undo())
+        with col2:
+            redo_clicked = st.button("↪️ Redo", key="edit_journal__redo", disabled=not journal.can_redo())
+        with col3:
+            with st.expander(f"Edit history ({len(journal.entries())} kept, {journal.nbytes:,} bytes)"):
+                entries = journal.entries()
+                if entries:
+                    history = pd.DataFrame(entries[::-1])
+                    history["timestamp"] = pd.to_datetime(history["timestamp"], unit="s")
+                    st.dataframe(history, hide_index=True)
+                else:
+                    st.caption("No edits submitted yet.")
+
+        if undo_clicked or redo_clicked:
+            before_token = self.store.cache_token()
+            try:
+                entry = journal.undo(self.store) if undo_clicked else journal.redo(self.store)
+            except Edit_Conflict as ex:
+                st.session_state.message_type = "error"
+                st.session_state.message_content = f"❌ {ex}"
+            else:
+                self.record_data_change(before_token, entry["diff"])
+                st.session_state.message_type = "info"
+                st.session_state.message_content = (
+                    f"{'↩️ Undid' if undo_clicked else '↪️ Redid'} {entry['cells']} cell change(s) "
+                    f"in {entry['rows']} row(s)."
+                )
+            st.rerun()
+    
+    def get_selected_row_ids(self, grid_response):
+        """Return the __row_id__ values selected in the grid, cast to the stored row id dtype"""
+        grid_state = grid_response.get("grid_state") or {}
+        row_selection = grid_state.get("rowSelection") or []
+        if not isinstance(row_selection, list):
+            return []
+
+        row_id_dtype = self.store.read_rows(0, 0)["__row_id__"].dtype
+        if row_id_dtype.kind in "iuf":
+            return pd.to_numeric(pd.Series(row_selection, dtype=object)).astype(row_id_dtype).tolist()
+        return list(row_selection)
+    
     def display_editing_table(self):
         """Display the selected rows for editing"""
         st.header("Edit Selected Rows")
         st.markdown("Edit the cells below. All cells in this table are editable.")
 
-        df_selected_edit = st.session_state.selected_rows_for_editing.copy()
+        grid_key = "selected_table_editing_grid"
+        with self.time_phase(grid_key, "read_data"):
+            if self.zero_copy:
+                df_selected_edit = st.session_state.selected_rows_for_editing
+            else:
+                df_selected_edit = st.session_state.selected_rows_for_editing.copy()
 
         # Configure grid options for editing
-        grid_options_selected = self.configure_base_grid_options(
-            df_selected_edit, 
-            editable=True
-        )
+        with self.time_phase(grid_key, "build_options"):
+            grid_options_selected = self.configure_base_grid_options(
+                df_selected_edit, 
+                editable=True
+            )
+
+        with self.time_phase(grid_key, "serialize"):
+            grid_data_selected = self.prepare_grid_data(df_selected_edit, grid_options_selected, grid_key)
+
+        if self.edit_return == 'events':
+            # The grid collects its own cell changes and reports them in a debounced batch
+            if f"{grid_key}__change_stream" not in st.session_state:
+                self.reset_pending_changes(grid_key)
+            grid_options_selected["context"] = {
+                **grid_options_selected.get("context", {}),
+                "cellChangeStream": st.session_state[f"{grid_key}__change_stream"]
+            }
+            grid_options_selected["onCellValueChanged"] = CELL_CHANGE_EVENTS_JS
+            update_mode_selected = GridUpdateMode.NO_UPDATE
+            update_on_selected = [("cellValueChanged", self.edit_debounce_ms)]
+        else:
+            update_mode_selected = GridUpdateMode.VALUE_CHANGED
+            update_on_selected = []
 
         # Display the editable grid
-        grid_response_selected = AgGrid(
-            df_selected_edit,
-            gridOptions=grid_options_selected,
-            update_mode=GridUpdateMode.VALUE_CHANGED,
-            data_return_mode=DataReturnMode.AS_INPUT,
-            height=self.height,
-            allow_unsafe_jscode=False,
-            enable_enterprise_modules=True,
-            theme=self.theme,
-            fit_columns_on_grid_load=True,
-            key="selected_table_editing_grid",
-            reload_data=False
-        )
+        with self.time_phase(grid_key, "aggrid"):
+            grid_response_selected = AgGrid(
+                grid_data_selected,
+                gridOptions=grid_options_selected,
+                update_mode=update_mode_selected,
+                update_on=update_on_selected,
+                data_return_mode=DataReturnMode.AS_INPUT,
+                height=self.height,
+                allow_unsafe_jscode=self.grid_payload == 'columnar' or self.edit_return == 'events',
+                try_to_convert_back_to_original_types=not self.prefills_row_data,
+                enable_enterprise_modules=True,
+                theme=self.theme,
+                fit_columns_on_grid_load=self.fits_columns(df_selected_edit),
+                key=grid_key,
+                reload_data=False
+            )
+
+        self.display_payload_stats(grid_key)
+
+        with self.time_phase(grid_key, "read_response"):
+            if self.edit_return == 'events':
+                # Only the buffered cell changes are submitted, the edited rows are never rebuilt
+                pending_changes = self.collect_cell_changes(grid_key, grid_response_selected)
+                edited_selected_df = None
+            else:
+                edited_selected_df = pd.DataFrame(grid_response_selected["data"])
+        self.finish_timings(grid_key, "render")
 
-        edited_selected_df = pd.DataFrame(grid_response_selected["data"])
+        if self.edit_return == 'events' and pending_changes:
+            pending_rows = len({row_id for row_id, _ in pending_changes})
+            st.caption(f"{len(pending_changes)} pending cell change(s) in {pending_rows} row(s).")
 
         st.markdown("---")
         col1, col2 = st.columns(2)
@@ -227,6 +828,7 @@ class Edit_Class(Aggrid_Class):
         
         with col2:
             if st.button("Cancel Editing"):
+                self.reset_pending_changes(grid_key)
                 st.session_state.message_type = "info"
                 st.session_state.message_content = "ℹ️ Editing cancelled. No changes applied."
                 st.session_state.view_mode = "full_table"
@@ -235,32 +837,170 @@ class Edit_Class(Aggrid_Class):
         # Show messages at bottom
         self.show_bottom_message()
     
-    def submit_changes(self, edited_selected_df):
-        """Submit the edited changes to the main dataframe"""
-        if "__row_id__" not in edited_selected_df.columns:
+    def get_pending_changes(self, key):
+        """Return the buffered {(row_id, column): change} cell changes of an editing grid"""
+        return st.session_state.setdefault(f"{key}__pending_changes", {})
+    
+    def reset_pending_changes(self, key):
+        """Drop an editing grid's buffered cell changes and start a new change stream for it"""
+        st.session_state[f"{key}__pending_changes"] = {}
+        st.session_state[f"{key}__change_seq"] = 0
+        st.session_state[f"{key}__change_stream"] = uuid.uuid4().hex
+    
+    def collect_cell_changes(self, key, grid_response):
+        """Move the cell changes the grid reported since the last rerun into the pending-changes buffer"""
+        pending = self.get_pending_changes(key)
+        context = (grid_response.get("grid_options") or {}).get("context") or {}
+        if context.get("cellChangeStream") != st.session_state.get(f"{key}__change_stream"):
+            # Left over from an earlier mount of the grid, already submitted or cancelled
+            return pending
+
+        last_seq = st.session_state.get(f"{key}__change_seq", 0)
+        for change in (context.get("cellChanges") or {}).values():
+            if change["seq"] > last_seq:
+                pending[(change["row_id"], change["col"])] = change
+        st.session_state[f"{key}__change_seq"] = context.get("cellChangeSeq", last_seq)
+        return pending
+    
+    def apply_changes(self, diff, grid_key, expected_versions=None):
+        """Write a diff to the store, journal and log it, returning the changed cell count or None on a conflict"""
+        apply_kwargs = {} if expected_versions is None else {"expected_versions": expected_versions}
+        before_token = self.store.cache_token()
+        try:
+            # Write only the changed cells instead of rebuilding the whole frame
+            with self.time_phase(grid_key, "apply"):
+                changed_cells = self.store.apply_diff(diff, **apply_kwargs)
+        except Row_Version_Conflict as ex:
+            st.session_state.message_type = "error"
+            st.session_state.message_content = (
+                f"❌ No changes applied: {len(ex.row_ids)} row(s) were changed by someone else "
+                f"since you started editing (__row_id__ {ex.row_ids[:10]}). Select them again to edit."
+            )
+            return None
+        # Grouped views over this store refresh only the groups holding these rows
+        self.record_data_change(before_token, diff)
+        with self.time_phase(grid_key, "journal"):
+            self.journal.record(diff)
+        return changed_cells
+    
+    def bulk_edit(self, row_ids, column, operation, **params):
+        """Apply one vectorized operation to a column of the rows with the given __row_id__s and report it"""
+        grid_key = "full_table_grid"
+        with self.time_phase(grid_key, "read_rows"):
+            # Versions are read before the rows, so a commit in between is caught as a conflict
+            row_versions = getattr(self.store, "row_versions", None)
+            expected_versions = row_versions(row_ids) if row_versions is not None else None
+            stored_rows = self.store.read_row_ids(row_ids)
+        try:
+            with self.time_phase(grid_key, "diff"):
+                diff = bulk_edit_diff(stored_rows, column, operation, **params)
+        except ValueError as ex:
+            st.session_state.message_type = "error"
+            st.session_state.message_content = f"❌ Bulk edit not applied: {ex}"
+            self.finish_timings(grid_key, "bulk_edit", changed_cells=0)
+            return None
+
+        if diff.is_empty():
+            st.session_state.message_type = "info"
+            st.session_state.message_content = (
+                f"ℹ️ The bulk edit did not change '{column}' in any of the {len(row_ids):,} selected row(s)."
+            )
+        elif self.apply_changes(diff, grid_key, expected_versions) is not None:
+            st.session_state.message_type = "success"
+            st.session_state.message_content = (
+                f"✅ Bulk edit applied: '{column}' changed in {len(diff.changed_row_ids):,} "
+                f"of {len(row_ids):,} selected row(s)."
+            )
+        self.finish_timings(grid_key, "bulk_edit", changed_cells=diff.cell_count)
+        return diff
+    
+    def display_bulk_edit_controls(self, selected_row_ids):
+        """Display a bulk-edit expander applying one operation to a column of every selected row at once"""
+        schema = self.store.read_rows(0, 0)
+        columns = [col for col in schema.columns if col != "__row_id__"]
+        number_columns = [col for col in columns if is_number_dtype(schema[col].dtype)]
+        labels = {
+            "set": "Set value",
+            "multiply": "Multiply by factor",
+            "replace": "Find and replace text",
+            "combine": "Arithmetic between columns",
+        }
+        with st.expander(f"Bulk edit {len(selected_row_ids):,} selected row(s)"):
+            col1, col2 = st.columns(2)
+            with col1:
+                operation = st.selectbox("Operation", BULK_OPERATIONS, format_func=labels.get, key="bulk_edit__operation")
+            with col2:
+                column = st.selectbox("Column", columns, key="bulk_edit__column")
+
+            params = {}
+            if operation == "set":
+                params["value"] = st.text_input("New value", key="bulk_edit__value")
+            elif operation == "multiply":
+                st.caption("Whole-number columns keep whole numbers, results are rounded.")
+                params["value"] = st.number_input("Factor", value=1.0, format="%g", key="bulk_edit__factor")
+            elif operation == "replace":
+                col1, col2 = st.columns(2)
+                with col1:
+                    params["find"] = st.text_input("Find", key="bulk_edit__find")
+                with col2:
+                    params["value"] = st.text_input("Replace with", key="bulk_edit__replace")
+            else:
+                st.caption("Whole-number columns only take whole-number results, others are rejected.")
+                col1, col2, col3 = st.columns([2, 1, 2])
+                with col1:
+                    params["left"] = st.selectbox("Left column", number_columns, key="bulk_edit__left")
+                with col2:
+                    params["op"] = st.selectbox("Operator", list(COLUMN_OPERATORS), key="bulk_edit__op")
+                with col3:
+                    params["right"] = st.selectbox("Right column", number_columns, key="bulk_edit__right")
+
+            if st.button("Apply to selected rows", key="bulk_edit__apply", disabled=not selected_row_ids):
+                self.bulk_edit(selected_row_ids, column, operation, **params)
+                st.rerun()
+    
+    def submit_changes(self, edited_selected_df=None):
+        """Submit the edited rows, or the pending cell changes when none are given, to the main dataframe"""
+        grid_key = "selected_table_editing_grid"
+        if edited_selected_df is not None and "__row_id__" not in edited_selected_df.columns:
             st.session_state.message_type = "error"
             st.session_state.message_content = "❌ Internal error: '__row_id__' column missing in edited data. Cannot process updates."
             st.rerun()
         else:
-            selected_ids_to_update = edited_selected_df["__row_id__"].tolist()
-            df_to_update = st.session_state.main_df.set_index("__row_id__").copy()
-            edited_rows_indexed = edited_selected_df.set_index("__row_id__")
-            data_cols_for_update = [col for col in edited_selected_df.columns if col != "__row_id__"]
-            
-            # Check if any actual changes were made
-            current_selected_data_in_main_df = df_to_update.loc[selected_ids_to_update, data_cols_for_update]
-            if edited_rows_indexed[data_cols_for_update].equals(current_selected_data_in_main_df):
+            if edited_selected_df is None:
+                changes = {cell: change["new"] for cell, change in self.get_pending_changes(grid_key).items()}
+                # Only the rows with a pending change are read, whatever the size of the selection
+                with self.time_phase(grid_key, "read_rows"):
+                    stored_rows = self.store.read_row_ids(list(dict.fromkeys(row_id for row_id, _ in changes)))
+                with self.time_phase(grid_key, "diff"):
+                    diff = diff_cell_changes(stored_rows, changes)
+            else:
+                # Compare cell by cell, only reading the edited rows from the store
+                with self.time_phase(grid_key, "read_rows"):
+                    stored_rows = self.store.read_row_ids(edited_selected_df["__row_id__"].tolist())
+                with self.time_phase(grid_key, "diff"):
+                    diff = diff_edited_rows(stored_rows, edited_selected_df)
+            if diff.is_empty():
                 st.session_state.message_type = "info"
                 st.session_state.message_content = "ℹ️ No actual changes were made to the data in the selected rows."
             else:
-                df_to_update.update(edited_rows_indexed[data_cols_for_update])
-                st.session_state.main_df = df_to_update.reset_index()
-                st.session_state.message_type = "success"
-                st.session_state.message_content = f"✅ Changes applied successfully to {len(selected_ids_to_update)} row(s)!"
+                # Versioned stores reject the submit if another session committed any of these rows meanwhile
+                changed_cells = self.apply_changes(diff, grid_key, st.session_state.get("editing_row_versions"))
+                if changed_cells is not None:
+                    st.session_state.message_type = "success"
+                    st.session_state.message_content = (
+                        f"✅ Changes applied successfully to {len(diff.changed_row_ids)} row(s) "
+                        f"({changed_cells} cell(s))!"
+                    )
+            self.finish_timings(grid_key, "submit", changed_cells=diff.cell_count)
+            self.reset_pending_changes(grid_key)
             
             st.session_state.view_mode = "full_table"
             st.rerun()
     
+    def export(self, fmt, target, columns=None, chunk_rows=None, progress=None):
+        """Write the full table's rows with its current sort and filter as csv, parquet or xlsx, returning the stats"""
+        return self.export_grid_rows(self.store, "full_table_grid", fmt, target, columns, chunk_rows, progress)
+    
     def run(self):
         """Main method to run the editing interface"""
         if st.session_state.view_mode == "full_table":
@@ -271,14 +1011,155 @@ class Edit_Class(Aggrid_Class):
 class View_Class(Aggrid_Class):
     """Class for read-only AG-Grid tables, inherited from Aggrid_Class"""
     
-    def __init__(self, df=None, **kwargs):
+    def __init__(self, df=None, key=None, source=None, load_key=None, placeholder_columns=None,
+                 prefetch_pages=1, max_pending_prefetches=2, loading_poll_seconds=0.5, group_by=None,
+                 aggregations=None, group_child_limit=1000, **kwargs):
         super().__init__(**kwargs)
-        if df is not None:
-            self.df = df.copy()
+        # A callable df or source is a loader, run in the shared thread pool while a placeholder grid is shown
+        loader = df if callable(df) else source if callable(source) and not hasattr(source, "read_rows") else None
+        if key is None and (loader is not None or self.row_model == 'serverSide' or source is not None or group_by):
+            # The load, page, query, block cache and group state live in session state under the key,
+            # a key that changes on every rerun would lose them and leak the old ones
+            raise ValueError(
+                "View_Class needs an explicit key for loaders, server-side paging, row sources and grouping."
+            )
+        self.key = key or f"view_table_{id(self)}"
+        if key is None:
+            self.unstable_keys.add(self.key)
+        self.loader = loader
+        self.load_key = load_key
+        self.placeholder_columns = placeholder_columns or []
+        self.loading_poll_seconds = loading_poll_seconds
+        # Server-side grids read this many pages on each side of the shown one in the background
+        self.prefetch_pages = prefetch_pages
+        self.max_pending_prefetches = max_pending_prefetches
+        # Initial server-side grouping, {column: 'sum'|'mean'|'count'|'min'|'max'} aggregates each group
+        self.group_by = list(group_by or [])
+        self.aggregations = dict(aggregations or {})
+        self.group_child_limit = group_child_limit
+        self.df = None
+        self.source = None
+        # The background load whose result is in df/source
+        self.loaded = None
+        if loader is None:
+            self.set_data(df, source)
+    
+    def set_data(self, df=None, source=None):
+        """Use a DataFrame, a data file path or a row source as the grid's data"""
+        # A data file path (Parquet, Arrow/Feather, CSV) or any row source, read a page at a time
+        self.source = open_file_source(source) if isinstance(source, (str, os.PathLike)) else source
+        if self.source is not None:
+            # The rows are never loaded as a whole, so paging, sorting and filtering run on the server
+            self.row_model = 'serverSide'
+            self.df = None
+        elif df is not None and self.zero_copy:
+            # Keep a reference only, rows are identified by the index instead of a __row_id__ column,
+            # compaction builds a new frame so that one is kept instead
+            self.df = self.compact_frame(df, self.key)
+        elif df is not None:
+            # Compaction builds a new frame, the caller's frame is only copied without it
+            self.df = self.compact_frame(df, self.key)
+            if self.df is df:
+                with self.time_phase(self.key, "copy_frame"):
+                    self.df = df.copy()
             if "__row_id__" not in self.df.columns:
                 self.df["__row_id__"] = self.df.index
         else:
-            self.df = self.create_sample_data()
+            self.df = self.compact_frame(self.create_sample_data(), self.key)
+    
+    def get_background_load(self):
+        """Return this grid's background load, starting it on first use or when the load_key changes"""
+        load_state_key = f"{self.key}__load"
+        load = st.session_state.get(load_state_key)
+        if load is None or load.load_key != self.load_key:
+            if load is not None:
+                load.cancel()
+            load = Background_Load(self.loader, self.load_key)
+            st.session_state[load_state_key] = load
+        return load
+    
+    def resolve_data(self):
+        """Take the loader's result once it has arrived and return whether the grid has data to show"""
+        if self.loader is None:
+            return True
+        load = self.get_background_load()
+        if not load.done() or load.failed():
+            return False
+        if self.loaded is not load:
+            # A loader may return a DataFrame, a data file path or a row source
+            result = load.result()
+            self.loaded = load
+            if isinstance(result, pd.DataFrame):
+                self.set_data(df=result)
+            else:
+                self.set_data(source=result)
+            self.finish_timings(self.key, "load", load_ms=round(load.elapsed() * 1000, 3))
+        return True
+    
+    def reload(self):
+        """Run the loader again on the next render, dropping the loaded data and its caches"""
+        load = st.session_state.pop(f"{self.key}__load", None)
+        if load is not None:
+            load.cancel()
+        prefetcher = st.session_state.get(f"{self.key}__prefetch")
+        if prefetcher is not None:
+            prefetcher.cancel()
+        for suffix in ("__blocks", "__query", "__prefetch"):
+            st.session_state.pop(f"{self.key}{suffix}", None)
+        self.df = None
+        self.source = None
+        self.loaded = None
+    
+    def display_loading_grid(self):
+        """Show an empty grid with a loading overlay until the loader's result arrives"""
+        load = self.get_background_load()
+        if load.failed():
+            st.session_state.message_type = "error"
+            st.session_state.message_content = f"❌ Loading the data failed: {load.future.exception()}"
+            st.button("Retry", key=f"{self.key}__retry", on_click=self.reload)
+            self.show_bottom_message()
+            return
+
+        AgGrid(
+            None,
+            gridOptions={
+                "columnDefs": [{"field": col} for col in self.placeholder_columns],
+                "rowData": [],
+                "loading": True,
+                "overlayLoadingTemplate": '<span class="ag-overlay-loading-center">Loading data…</span>',
+            },
+            update_mode=GridUpdateMode.NO_UPDATE,
+            height=self.height,
+            theme=self.theme,
+            key=f"{self.key}__placeholder",
+        )
+
+        @st.fragment(run_every=self.loading_poll_seconds)
+        def wait_for_data():
+            # Only this fragment reruns while waiting, the whole page reruns once the data is there
+            if load.done():
+                st.rerun()
+            st.caption(f"Loading data… {load.elapsed():.1f} s")
+
+        wait_for_data()
+    
+    def prefetch_neighbour_pages(self, block_cache, page, page_size, total_rows):
+        """Read the pages around the shown one into the block cache in the background"""
+        if self.prefetch_pages < 1:
+            return
+        prefetcher = st.session_state.get(f"{self.key}__prefetch")
+        if prefetcher is None or prefetcher.max_pending != self.max_pending_prefetches:
+            prefetcher = Page_Prefetcher(max_pending=self.max_pending_prefetches)
+            st.session_state[f"{self.key}__prefetch"] = prefetcher
+        # Nearest pages first, so the bounded number of fetches goes to the likeliest next clicks
+        neighbours = []
+        for distance in range(1, self.prefetch_pages + 1):
+            neighbours += [page + distance, page - distance]
+        prefetcher.schedule(block_cache, [
+            (neighbour * page_size, min((neighbour + 1) * page_size, total_rows))
+            for neighbour in neighbours
+            if 0 <= neighbour * page_size < total_rows
+        ])
     
     def create_sample_data(self):
         """Create sample data if no dataframe is provided"""
@@ -292,39 +1173,270 @@ class View_Class(Aggrid_Class):
         df["__row_id__"] = df.index
         return df
     
+    def get_group_settings(self, df_schema):
+        """Show the grouping controls of a server-side grid and return its (group_by, aggregations)"""
+        columns = [col for col in df_schema.columns if col != "__row_id__"]
+        group_key = f"{self.key}__group_by"
+        if group_key not in st.session_state:
+            st.session_state[group_key] = [col for col in self.group_by if col in columns]
+
+        aggregations = {}
+        with st.expander("Group rows", expanded=bool(st.session_state[group_key])):
+            group_by = st.multiselect("Group by", columns, key=group_key)
+            agg_columns = [col for col in columns if col not in group_by]
+            if group_by and agg_columns:
+                selectors = st.columns(min(len(agg_columns), 4))
+                for i, col in enumerate(agg_columns):
+                    dtype = df_schema[col].dtype
+                    # Text can only be counted or ranged, categories only counted
+                    if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+                        options = AGGREGATIONS
+                    elif isinstance(dtype, pd.CategoricalDtype):
+                        options = ("count",)
+                    else:
+                        options = ("count", "min", "max")
+                    agg_key = f"{self.key}__aggregate__{col}"
+                    if st.session_state.get(agg_key) not in ("—", *options):
+                        st.session_state[agg_key] = self.aggregations.get(col, "—") \
+                            if self.aggregations.get(col) in options else "—"
+                    with selectors[i % len(selectors)]:
+                        func = st.selectbox(col, ["—", *options], key=agg_key)
+                    if func != "—":
+                        aggregations[col] = func
+        return group_by, aggregations
+    
+    def get_group_cache(self, source):
+        """Return the groupby cache of this grid, brought up to date with the edits logged in this session"""
+        source = as_row_source(source)
+        cache = st.session_state.get(f"{self.key}__group_cache")
+        if cache is None:
+            cache = Group_Cache(source)
+            st.session_state[f"{self.key}__group_cache"] = cache
+        else:
+            cache.follow(source, self.get_data_changes())
+        return cache
+    
+    def get_expanded_groups(self):
+        """Return the row ids of the groups open in the grid's last returned state"""
+        grid_value = st.session_state.get(self.key)
+        grid_state = (grid_value.get("gridState") if isinstance(grid_value, dict) else None) or {}
+        return set((grid_state.get("rowGroupExpansion") or {}).get("expandedRowGroupIds") or [])
+    
+    def get_grouped_rows(self, source, query_source, group_by, aggregations, grid_options):
+        """Return the tree rows of the current page of groups, with the rows of the expanded groups only"""
+        sort_model, filter_model = self.get_grid_query(self.key)
+        cache = self.get_group_cache(source)
+        result = cache.groups(
+            group_by, aggregations,
+            positions=getattr(query_source, "positions", None),
+            query_key=getattr(query_source, "query_key", ("", "")),
+            query_columns=[entry.get("colId") for entry in sort_model] + list(filter_model)
+        )
+
+        # Groups are sorted by the grid's sort model where it names a grouping or aggregated column
+        groups = pd.DataFrame(list(result.rows.index), columns=list(group_by))
+        for col in result.rows.columns:
+            groups[col] = result.rows[col].to_numpy()
+        groups["__group_key__"] = result.keys
+        sort_entries = [entry for entry in sort_model if entry.get("colId") in groups.columns]
+        if sort_entries:
+            groups = groups.sort_values(
+                [entry["colId"] for entry in sort_entries],
+                ascending=[entry.get("sort", "asc") == "asc" for entry in sort_entries],
+                kind="stable", na_position="last"
+            )
+
+        total_groups = len(groups)
+        page, page_size = self.get_page_state(self.key, total_groups)
+        page_groups = groups.iloc[page * page_size:(page + 1) * page_size]
+        expanded = self.get_expanded_groups()
+
+        records = []
+        group_records = serialize_rows(
+            page_groups.drop(columns="__group_key__"),
+            row_ids=[group_row_id(key) for key in page_groups["__group_key__"]]
+        )
+        for record, key in zip(group_records, page_groups["__group_key__"]):
+            row_id = record["__pandas_index"]
+            label = " / ".join("(blank)" if pd.isna(value) else str(value) for value in key)
+            record["__path__"] = [f"{label} ({record.pop('__count__'):,})"]
+            records.append(record)
+            if row_id not in expanded:
+                # A placeholder child gives the group its expand arrow, its rows are read once it is opened
+                records.append({"__path__": [*record["__path__"], "Loading…"], "__pandas_index": f"{row_id}:loading"})
+                continue
+            children = cache.children(result, key, limit=self.group_child_limit)
+            for child in serialize_rows(children):
+                child["__path__"] = [*record["__path__"], child["__pandas_index"]]
+                records.append(child)
+            hidden = len(result.members[key]) - len(children)
+            if hidden > 0:
+                records.append({"__path__": [*record["__path__"], f"… {hidden:,} more rows"],
+                                "__pandas_index": f"{row_id}:more"})
+
+        grid_options.update({
+            "treeData": True,
+            "getDataPath": GROUP_PATH_JS,
+            "getRowId": ROW_ID_JS,
+            "isGroupOpenByDefault": GROUP_OPEN_JS,
+            "context": {**grid_options.get("context", {}), "expandedGroups": sorted(expanded)},
+            "autoGroupColumnDef": {"headerName": " / ".join(group_by), "minWidth": 240,
+                                   "cellRendererParams": {"suppressCount": True}},
+        })
+        return records, total_groups, page, page_size
+    
     def display_view_table(self, title="Data View", description="Read-only view of the data"):
         """Display the dataframe in read-only mode"""
         st.header(title)
         st.markdown(description)
 
-        # Configure grid options for viewing only
-        grid_options = self.configure_base_grid_options(
-            self.df, 
-            editable=False
-        )
+        if not self.resolve_data():
+            self.display_loading_grid()
+            return
+
+        # Configure grid options for viewing only, a file source only needs its schema for them
+        df_schema = self.df if self.source is None else self.source.read_rows(0, 0)
+        with self.time_phase(self.key, "build_options"):
+            grid_options = self.configure_base_grid_options(
+                df_schema, 
+                editable=False
+            )
+
+        group_by = []
+        update_on = []
+        if self.row_model == 'serverSide':
+            base_source = self.df if self.source is None else self.source
+            group_by, aggregations = self.get_group_settings(df_schema)
+            # Only the rows of the current page are sliced from the sorted/filtered frame and sent
+            with self.time_phase(self.key, "query"):
+                source = self.apply_grid_query(base_source, self.key)
+            if group_by:
+                # Groups are aggregated on the server, a group's rows are only read and sent once it is opened
+                with self.time_phase(self.key, "group"):
+                    grid_options["rowData"], total_rows, page, page_size = self.get_grouped_rows(
+                        base_source, source, group_by, aggregations, grid_options
+                    )
+                update_on = ["rowGroupOpened"]
+            else:
+                with self.time_phase(self.key, "query"):
+                    block_cache = self.get_row_block_cache(source, self.key)
+                    total_rows = block_cache.source.row_count()
+                    page, page_size = self.get_page_state(self.key, total_rows)
+                with self.time_phase(self.key, "serialize"):
+                    grid_options["rowData"] = block_cache.get_rows(page * page_size, (page + 1) * page_size)
+            grid_data = None
+            update_mode = GridUpdateMode.SORTING_CHANGED | GridUpdateMode.FILTERING_CHANGED
+        else:
+            with self.time_phase(self.key, "serialize"):
+                grid_data = self.prepare_grid_data(self.df, grid_options, self.key)
+            # Exports follow the grid's sort and filter, so those have to come back to Python
+            update_mode = GridUpdateMode.SORTING_CHANGED | GridUpdateMode.FILTERING_CHANGED if self.show_export \
+                else GridUpdateMode.NO_UPDATE
 
         # Display the read-only grid
-        AgGrid(
-            self.df,
-            gridOptions=grid_options,
-            update_mode=GridUpdateMode.NO_UPDATE,
-            data_return_mode=DataReturnMode.AS_INPUT,
-            height=self.height,
-            allow_unsafe_jscode=False,
-            enable_enterprise_modules=True,
-            theme=self.theme,
-            fit_columns_on_grid_load=True,
-            key=f"view_table_{id(self)}",
-            reload_data=False
-        )
+        with self.time_phase(self.key, "aggrid"):
+            AgGrid(
+                grid_data,
+                gridOptions=grid_options,
+                update_mode=update_mode,
+                update_on=update_on,
+                data_return_mode=DataReturnMode.AS_INPUT,
+                height=self.height,
+                allow_unsafe_jscode=self.grid_payload == 'columnar' or bool(group_by),
+                try_to_convert_back_to_original_types=not self.prefills_row_data,
+                enable_enterprise_modules=True,
+                theme=self.theme,
+                fit_columns_on_grid_load=self.fits_columns(df_schema),
+                key=self.key,
+                reload_data=False
+            )
+        
+        self.display_payload_stats(self.key)
+        self.display_memory_report(self.key)
+        if self.row_model == 'serverSide':
+            self.display_page_controls(self.key, page, page_size, total_rows)
+            if not group_by:
+                self.prefetch_neighbour_pages(block_cache, page, page_size, total_rows)
+        self.finish_timings(self.key, "render")
+        self.display_export_controls(self.df if self.source is None else self.source, self.key)
         
         # Show messages at bottom if any
         self.show_bottom_message()
     
+    def export(self, fmt, target, columns=None, chunk_rows=None, progress=None):
+        """Write this grid's rows with its current sort and filter as csv, parquet or xlsx, returning the stats"""
+        if not self.resolve_data():
+            raise ValueError("The grid's data has not finished loading yet.")
+        return self.export_grid_rows(
+            self.df if self.source is None else self.source, self.key, fmt, target, columns, chunk_rows, progress
+        )
+    
     def run(self, title="Data View", description="Read-only view of the data"):
         """Main method to run the view interface"""
         self.display_view_table(title, description)
 
+class Grid_Container:
+    """Multi-grid page area that builds and renders only the grids currently shown"""
+    
+    def __init__(self, key, layout='tabs'):
+        if layout not in ('tabs', 'sections'):
+            raise ValueError(f"Unsupported layout '{layout}'. Use 'tabs' or 'sections'.")
+        self.key = key
+        # 'tabs' shows one grid at a time behind a segmented control,
+        # 'sections' gives every grid a toggle and renders the ones switched on
+        self.layout = layout
+        self.grids = OrderedDict()
+    
+    def add(self, label, builder, *run_args, render=None):
+        """Register a grid, builder() is only called the first time the grid is shown"""
+        # render(grid) draws the grid with its surrounding content, grid.run(*run_args) by default
+        self.grids[label] = (builder, run_args, render)
+        return self
+    
+    def get_grid(self, label):
+        """Return the grid built for a label, keeping it for later reruns so its data and options are reused"""
+        built = st.session_state.setdefault(f"{self.key}__grids", {})
+        if label not in built:
+            builder, _, _ = self.grids[label]
+            built[label] = builder()
+        return built[label]
+    
+    def clear(self, label=None):
+        """Drop one built grid, or all of them, so they are built again when next shown"""
+        built = st.session_state.get(f"{self.key}__grids", {})
+        if label is None:
+            built.clear()
+        else:
+            built.pop(label, None)
+    
+    def render_grid(self, label):
+        """Build the grid of a label if needed and draw it"""
+        _, run_args, render = self.grids[label]
+        grid = self.get_grid(label)
+        if render is None:
+            grid.run(*run_args)
+        else:
+            render(grid)
+    
+    def render(self):
+        """Draw the selector and only the shown grids, hidden grids are neither built nor sent"""
+        labels = list(self.grids)
+        if not labels:
+            return
+        if self.layout == 'tabs':
+            last_key = f"{self.key}__last_active"
+            active = st.segmented_control(
+                "Grid", labels, default=labels[0], key=f"{self.key}__active", label_visibility="collapsed"
+            )
+            # Clicking the active option again deselects it, keep showing that grid
+            active = active or st.session_state.get(last_key, labels[0])
+            st.session_state[last_key] = active
+            self.render_grid(active)
+        else:
+            for label in labels:
+                if st.toggle(label, key=f"{self.key}__show__{label}"):
+                    self.render_grid(label)
+
 # Example usage and customization
 def example_usage():
     """Examples of using the classes with different colors and styles"""
@@ -333,16 +1445,11 @@ def example_usage():
     
     st.title("AG-Grid Classes Examples")
     
-    # Create tabs for different examples
-    tab1, tab2, tab3, tab4 = st.tabs(["Editable Table", "Blue Theme View", "Green Theme View", "Purple Theme View"])
-    
-    with tab1:
+    def render_editor(editor):
         st.subheader("Example 1: Editable Table (Default Style)")
-        editor = Edit_Class()
         editor.run()
     
-    with tab2:
-        st.subheader("Example 2: Blue Theme View")
+    def build_blue_viewer():
         # Create sample data
         sample_df = pd.DataFrame({
             'Product': ['Laptop', 'Mouse', 'Keyboard', 'Monitor', 'Headphones'] * 4,
@@ -351,7 +1458,7 @@ def example_usage():
             'Stock': [50, 200, 100, 30, 75] * 4
         })
         
-        blue_viewer = View_Class(
+        return View_Class(
             df=sample_df,
             theme='balham',
             height=500,
@@ -360,10 +1467,8 @@ def example_usage():
             font_size='14px',
             font_family='Segoe UI, sans-serif'
         )
-        blue_viewer.run("Product Inventory", "Blue themed view of product data")
     
-    with tab3:
-        st.subheader("Example 3: Green Theme View")
+    def build_green_viewer():
         # Create different sample data
         green_df = pd.DataFrame({
             'Employee': ['John Doe', 'Jane Smith', 'Mike Johnson', 'Sarah Wilson', 'Tom Brown'] * 4,
@@ -372,7 +1477,7 @@ def example_usage():
             'Rating': [4.5, 4.2, 4.8, 4.0, 4.6] * 4
         })
         
-        green_viewer = View_Class(
+        return View_Class(
             df=green_df,
             theme='alpine',
             height=400,
@@ -381,10 +1486,8 @@ def example_usage():
             font_size='15px',
             font_family='Georgia, serif'
         )
-        green_viewer.run("Employee Records", "Green themed employee data view")
     
-    with tab4:
-        st.subheader("Example 4: Purple Theme View")
+    def build_purple_viewer():
         # Create another sample data
         purple_df = pd.DataFrame({
             'Course': ['Python', 'JavaScript', 'React', 'SQL', 'Machine Learning'] * 4,
@@ -393,7 +1496,7 @@ def example_usage():
             'Students': [120, 85, 65, 95, 45] * 4
         })
         
-        purple_viewer = View_Class(
+        return View_Class(
             df=purple_df,
             theme='material',
             height=450,
@@ -402,7 +1505,33 @@ def example_usage():
             font_size='16px',
             font_family='Roboto, sans-serif'
         )
-        purple_viewer.run("Course Catalog", "Purple themed course information")
+    
+    def load_order_history():
+        # Stands in for a slow query, it runs in the background while a placeholder grid is shown
+        time.sleep(2)
+        return pd.DataFrame({
+            'Order': range(1, 5001),
+            'Customer': ['Acme', 'Globex', 'Initech', 'Umbrella', 'Hooli'] * 1000,
+            'Amount': [round(10 + (i * 37) % 990, 2) for i in range(5000)],
+        })
+    
+    def build_lazy_viewer():
+        return View_Class(
+            df=load_order_history,
+            key="lazy_order_history",
+            placeholder_columns=['Order', 'Customer', 'Amount'],
+            row_model='serverSide',
+            page_size=50
+        )
+    
+    # Only the selected example is built and sent to the browser
+    examples = Grid_Container("examples")
+    examples.add("Editable Table", Edit_Class, render=render_editor)
+    examples.add("Blue Theme View", build_blue_viewer, "Product Inventory", "Blue themed view of product data")
+    examples.add("Green Theme View", build_green_viewer, "Employee Records", "Green themed employee data view")
+    examples.add("Purple Theme View", build_purple_viewer, "Course Catalog", "Purple themed course information")
+    examples.add("Lazy Loaded View", build_lazy_viewer, "Order History", "Loaded in the background, pages prefetched")
+    examples.render()
 
 # Run the examples
 if __name__ == "__main__":
@@ -0,0 +1,124 @@
+import json
+import threading
+from collections import OrderedDict
+
+
+def serialize_rows(df, row_ids=None):
+    """Serialize a frame slice to grid row records, tagging each record with its grid row id"""
+    if row_ids is None:
+        # Row identity comes from the __row_id__ column, or the index when it is not materialized
+        row_ids = df["__row_id__"] if "__row_id__" in df.columns else df.index
+    records = json.loads(df.to_json(orient="records", date_format="iso"))
+    for record, row_id in zip(records, row_ids):
+        record["__pandas_index"] = str(row_id)
+    return records
+
+
+class DataFrame_Source:
+    """Row source backed by an in-memory DataFrame"""
+
+    def __init__(self, df):
+        self.df = df
+
+    @property
+    def columns(self):
+        return list(self.df.columns)
+
+    def row_count(self):
+        return len(self.df)
+
+    def read_rows(self, start, stop):
+        """Return the rows between two positions as a DataFrame slice"""
+        return self.df.iloc[start:stop]
+
+    def read_column(self, col):
+        """Return one full column"""
+        return self.df[col]
+
+    def take(self, positions):
+        """Return the rows at the given positions, in that order"""
+        return self.df.iloc[positions]
+
+    def cache_token(self):
+        """Identify the frame, the block cache holds a reference so the id cannot be reused meanwhile"""
+        return ("frame", id(self.df), self.df.shape)
+
+
+def as_row_source(data):
+    """Wrap a DataFrame in a DataFrame_Source, passing row sources through unchanged"""
+    return data if hasattr(data, "read_rows") else DataFrame_Source(data)
+
+
+def detached_source(source):
+    """Return a source reading the same rows that is safe to read outside the script thread"""
+    # Sources backed by st.session_state resolve it on the script thread and read the snapshot instead
+    detached = getattr(source, "detached", None)
+    return detached() if detached is not None else source
+
+
+class Row_Block_Cache:
+    """LRU cache of serialized row blocks read from a row source"""
+
+    def __init__(self, source, block_size=100, max_blocks=10):
+        if block_size < 1 or max_blocks < 1:
+            raise ValueError("block_size and max_blocks must both be at least 1.")
+        self.source = source
+        self.token = source.cache_token()
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self.hits = 0
+        self.misses = 0
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def serves(self, source):
+        """Return whether the cached blocks are still valid for a source"""
+        return self.token == source.cache_token()
+
+    def get_block(self, block_index, source=None):
+        """Return the serialized records of one block, reading it from the source (or a detached copy) on a miss"""
+        source = source or self.source
+        with self._lock:
+            if block_index in self._blocks:
+                self._blocks.move_to_end(block_index)
+                self.hits += 1
+                return self._blocks[block_index]
+            self.misses += 1
+
+        start = block_index * self.block_size
+        stop = min(start + self.block_size, source.row_count())
+        block = serialize_rows(source.read_rows(start, stop))
+
+        with self._lock:
+            self._blocks[block_index] = block
+            self._blocks.move_to_end(block_index)
+            while len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+        return block
+
+    def block_indexes(self, start, stop):
+        """Return the indexes of the blocks holding the rows between two positions"""
+        stop = min(stop, self.source.row_count())
+        if stop <= start:
+            return range(0)
+        return range(start // self.block_size, (stop - 1) // self.block_size + 1)
+
+    def is_cached(self, start, stop):
+        """Return whether every block holding the rows between two positions is cached"""
+        with self._lock:
+            return all(block_index in self._blocks for block_index in self.block_indexes(start, stop))
+
+    def get_rows(self, start, stop):
+        """Return the serialized records between two positions, assembled from cached blocks"""
+        stop = min(stop, self.source.row_count())
+        records = []
+        for block_index in self.block_indexes(start, stop):
+            offset = block_index * self.block_size
+            block = self.get_block(block_index)
+            records.extend(block[max(start - offset, 0):stop - offset])
+        return records
+
+    def clear(self):
+        """Drop every cached block"""
+        with self._lock:
+            self._blocks.clear()
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from pandas.api import types as ptypes
+
+
+def compact_series(series, max_category_ratio=0.5):
+    """Return a column in the smallest dtype that holds its values exactly, or the column itself"""
+    dtype = series.dtype
+    if ptypes.is_bool_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype) or not len(series):
+        return series
+
+    if ptypes.is_object_dtype(dtype) or ptypes.is_string_dtype(dtype):
+        # Only text repeated often enough is worth a categorical, unique-ish text would grow instead
+        if ptypes.infer_dtype(series, skipna=True) != "string":
+            return series
+        if series.nunique(dropna=True) > max_category_ratio * len(series):
+            return series
+        return series.astype("category")
+
+    if not isinstance(dtype, np.dtype):
+        return series
+
+    if ptypes.is_integer_dtype(dtype):
+        return pd.to_numeric(series, downcast="integer" if dtype.kind == "i" else "unsigned")
+
+    if ptypes.is_float_dtype(dtype) and dtype.itemsize > 4:
+        # float32 is used only when every value survives the round trip, 4.2 for instance does not
+        narrowed = series.astype(np.float32)
+        if np.array_equal(narrowed.to_numpy(np.float64), series.to_numpy(np.float64), equal_nan=True):
+            return narrowed
+    return series
+
+
+def compact_dtypes(df, max_category_ratio=0.5, exclude=("__row_id__",)):
+    """Return a compacted copy of df and a report of its memory before and after, per column and in total"""
+    columns = {}
+    report = {"before_bytes": 0, "after_bytes": 0, "columns": {}}
+    for col in df.columns:
+        series = df[col]
+        compacted = series if col in exclude else compact_series(series, max_category_ratio)
+        before = int(series.memory_usage(deep=True, index=False))
+        after = int(compacted.memory_usage(deep=True, index=False))
+        report["before_bytes"] += before
+        report["after_bytes"] += after
+        if compacted.dtype != series.dtype:
+            report["columns"][col] = {
+                "from": str(series.dtype), "to": str(compacted.dtype), "before_bytes": before, "after_bytes": after
+            }
+        # Arrays rather than Series, so duplicate index labels are never aligned
+        columns[col] = compacted.array
+    return pd.DataFrame(columns, index=df.index), report
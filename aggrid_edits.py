@@ -0,0 +1,357 @@
+import operator
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from pandas.api import types as ptypes
+
+
+def index_by_row_id(df):
+    """Index a frame by its __row_id__ column in place, keeping the column for the grid"""
+    df.index = pd.Index(df["__row_id__"].to_numpy())
+    return df
+
+
+def row_positions(df, row_ids):
+    """Return the integer positions of row ids in a frame indexed by __row_id__"""
+    positions = df.index.get_indexer(pd.Index(row_ids))
+    if (positions < 0).any():
+        missing = [row_id for row_id, pos in zip(row_ids, positions) if pos < 0]
+        raise KeyError(f"Unknown __row_id__ value(s): {missing[:10]}")
+    return positions
+
+
+def fits_dtype(values, dtype):
+    """Return whether integral values all lie within the range of an integer dtype"""
+    info = np.iinfo(dtype)
+    return not len(values) or (values.min() >= info.min and values.max() <= info.max)
+
+
+def coerce_like(values, stored):
+    """Coerce edited values to the dtype of the stored column wherever that is lossless"""
+    dtype = stored.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        # Compare as the category values, "25" is 25 in a numeric category, then as the category itself
+        converted = coerce_like(values, pd.Series(dtype.categories))
+        return converted.astype(dtype) if converted.dropna().isin(dtype.categories).all() else converted
+
+    if ptypes.is_bool_dtype(dtype):
+        lowered = values.map(lambda v: v.strip().lower() if isinstance(v, str) else v)
+        mapped = lowered.map({"true": True, "false": False, True: True, False: False, 1: True, 0: False})
+        return mapped.where(mapped.notna(), values)
+
+    if ptypes.is_numeric_dtype(dtype):
+        converted = pd.to_numeric(values, errors="coerce")
+        failed = converted.isna() & values.notna()
+        if failed.any():
+            # Text that is not a number is a real change, keep it as typed
+            return values.astype(object).where(failed, converted)
+        if ptypes.is_integer_dtype(dtype) and converted.notna().all() and (converted % 1 == 0).all():
+            if fits_dtype(converted, dtype):
+                return converted.astype(dtype)
+            # Too large for a downcast column, use the smallest integer dtype that holds the values
+            return pd.to_numeric(converted, downcast="integer") if fits_dtype(converted, np.int64) else converted
+        if ptypes.is_float_dtype(dtype) and dtype.itemsize < 8:
+            narrowed = converted.astype(dtype)
+            if np.array_equal(narrowed.to_numpy(np.float64), converted.to_numpy(np.float64), equal_nan=True):
+                return narrowed
+        return converted
+
+    if ptypes.is_datetime64_any_dtype(dtype):
+        converted = pd.to_datetime(values, errors="coerce")
+        if getattr(dtype, "tz", None) is not None and converted.dt.tz is None:
+            converted = converted.dt.tz_localize(dtype.tz)
+        failed = converted.isna() & values.notna()
+        return values.astype(object).where(failed, converted) if failed.any() else converted
+
+    if ptypes.infer_dtype(stored, skipna=True) == "string":
+        # The grid may hand back "25" as 25, compare text columns as text
+        return values.where(values.isna(), values.astype(str))
+
+    return values
+
+
+def values_differ(stored, edited):
+    """Return a boolean Series marking the positions where two aligned Series differ"""
+    both_missing = stored.isna() & edited.isna()
+    try:
+        equal = stored.eq(edited)
+    except TypeError:
+        equal = stored.astype(object).eq(edited.astype(object))
+    return ~(equal.fillna(False).astype(bool) | both_missing)
+
+
+class Cell_Diff:
+    """Cell-level differences between stored rows and their edited versions, indexed by __row_id__"""
+
+    def __init__(self, old, new, mask):
+        self.old = old
+        self.new = new
+        self.mask = mask
+
+    @property
+    def changed_row_ids(self):
+        return self.mask.index[self.mask.any(axis=1).to_numpy()].tolist()
+
+    @property
+    def cell_count(self):
+        return int(self.mask.to_numpy().sum())
+
+    def is_empty(self):
+        return self.cell_count == 0
+
+    def changed_columns(self):
+        """Return the columns with at least one changed cell"""
+        return [col for col in self.mask.columns if self.mask[col].any()]
+
+    def compact(self):
+        """Return the same diff restricted to its changed rows and columns"""
+        rows, columns = self.changed_row_ids, self.changed_columns()
+        return Cell_Diff(
+            self.old.loc[rows, columns].copy(),
+            self.new.loc[rows, columns].copy(),
+            self.mask.loc[rows, columns].copy()
+        )
+
+    def inverted(self):
+        """Return the diff that restores the old values of the changed cells"""
+        return Cell_Diff(self.new, self.old, self.mask)
+
+    def memory_usage(self):
+        """Return the bytes held by the old values, new values and mask"""
+        return int(sum(frame.memory_usage(deep=True).sum() for frame in (self.old, self.new, self.mask)))
+
+
+def diff_edited_rows(df, edited_df, columns=None):
+    """Compare edited rows against the stored frame and return a Cell_Diff of what really changed"""
+    edited = edited_df.set_index("__row_id__")
+    if columns is None:
+        columns = [col for col in edited.columns if col in df.columns and col != "__row_id__"]
+
+    old = df.iloc[row_positions(df, edited.index)][columns]
+    old.index = edited.index
+    new = pd.DataFrame({col: coerce_like(edited[col], old[col]) for col in columns}, index=edited.index)
+    mask = pd.DataFrame({col: values_differ(old[col], new[col]) for col in columns}, index=edited.index)
+    return Cell_Diff(old, new, mask)
+
+
+def diff_cell_changes(df, changes):
+    """Compare {(row_id, column): new value} changes against the stored rows and return a Cell_Diff"""
+    row_ids = list(dict.fromkeys(row_id for row_id, _ in changes))
+    columns = [
+        col for col in dict.fromkeys(col for _, col in changes)
+        if col in df.columns and col != "__row_id__"
+    ]
+
+    old = df.iloc[row_positions(df, row_ids)][columns]
+    old.index = pd.Index(row_ids)
+    # Untouched cells keep their stored value, so only the changed cells can differ
+    raw = old.astype(object)
+    for (row_id, col), value in changes.items():
+        if col in raw.columns:
+            raw.at[row_id, col] = value
+    new = pd.DataFrame({col: coerce_like(raw[col], old[col]) for col in columns}, index=old.index)
+    mask = pd.DataFrame({col: values_differ(old[col], new[col]) for col in columns}, index=old.index)
+    return Cell_Diff(old, new, mask)
+
+
+BULK_OPERATIONS = ("set", "multiply", "replace", "combine")
+
+COLUMN_OPERATORS = {"+": operator.add, "-": operator.sub, "*": operator.mul, "/": operator.truediv}
+
+
+def is_number_dtype(dtype):
+    return ptypes.is_numeric_dtype(dtype) and not ptypes.is_bool_dtype(dtype)
+
+
+def bulk_edit_diff(rows, column, operation, value=None, find=None, left=None, op="+", right=None):
+    """Apply one vectorized operation to a column of rows indexed by __row_id__ and return the Cell_Diff it makes"""
+    # set: column = value, multiply: column = column * value, replace: find -> value in the column's text,
+    # combine: column = left op right of two number columns. Results that do not fit the column raise ValueError.
+    if operation not in BULK_OPERATIONS:
+        raise ValueError(f"Unsupported bulk operation '{operation}'. Use one of: {', '.join(BULK_OPERATIONS)}.")
+    if column not in rows.columns or column == "__row_id__":
+        raise ValueError(f"Unknown column '{column}'.")
+    stored = rows[column]
+
+    if operation == "set":
+        values = pd.Series([value] * len(rows), index=rows.index, dtype=object)
+    elif operation == "multiply":
+        if not is_number_dtype(stored.dtype):
+            raise ValueError(f"Column '{column}' does not hold numbers, it cannot be multiplied.")
+        try:
+            factor = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"'{value}' is not a number.") from None
+        if not np.isfinite(factor):
+            raise ValueError(f"'{value}' is not a finite number.")
+        with np.errstate(over="ignore"):
+            values = stored.astype(np.float64) * factor
+        infinite = np.isinf(values.to_numpy())
+        if infinite.any():
+            raise ValueError(f"The result is too large in {int(infinite.sum())} row(s), nothing was changed.")
+    elif operation == "replace":
+        if is_number_dtype(stored.dtype) or ptypes.is_bool_dtype(stored.dtype) \
+                or ptypes.is_datetime64_any_dtype(stored.dtype):
+            raise ValueError(f"Column '{column}' does not hold text, use 'set' instead of find-and-replace.")
+        if not find:
+            raise ValueError("Enter the text to find.")
+        text = stored.astype("string")
+        values = text.str.replace(str(find), "" if value is None else str(value), regex=False)
+        values = values.astype(object).where(stored.notna(), stored.astype(object))
+    else:
+        if op not in COLUMN_OPERATORS:
+            raise ValueError(f"Unsupported operator '{op}'. Use one of: {', '.join(COLUMN_OPERATORS)}.")
+        for col in (left, right):
+            if col not in rows.columns or not is_number_dtype(rows[col].dtype):
+                raise ValueError(f"Column '{col}' does not hold numbers, it cannot be used in arithmetic.")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = COLUMN_OPERATORS[op](rows[left].astype(np.float64), rows[right].astype(np.float64))
+        infinite = np.isinf(values.to_numpy())
+        if infinite.any():
+            raise ValueError(f"Division by zero in {int(infinite.sum())} row(s), nothing was changed.")
+
+    new = coerce_like(values, stored)
+    # Text that did not convert is only acceptable in a text column
+    if new.dtype == object and (is_number_dtype(stored.dtype) or ptypes.is_bool_dtype(stored.dtype)
+                                or ptypes.is_datetime64_any_dtype(stored.dtype)):
+        raise ValueError(f"'{value}' does not fit column '{column}' of type {stored.dtype}.")
+    if ptypes.is_float_dtype(new.dtype) and np.isinf(new.to_numpy()).any():
+        # An infinity, e.g. 'set' to "inf", would also turn a whole-number column to floats
+        raise ValueError(f"'{value}' is not a finite number.")
+    if ptypes.is_integer_dtype(stored.dtype) and ptypes.is_float_dtype(new.dtype) and new.notna().all():
+        if operation == "combine":
+            # Age / Salary would silently come out as 0s and 1s, a whole-number column only takes whole results
+            fractional = int((new % 1 != 0).sum())
+            raise ValueError(
+                f"{fractional} result(s) are not whole numbers and do not fit column '{column}' of type "
+                f"{stored.dtype}, nothing was changed."
+            )
+        if operation == "multiply":
+            # Whole-number columns take rounded products, 3 * 1.1 gives 3 rather than turning the column to floats
+            new = coerce_like(new.round(), stored)
+
+    old = rows[[column]]
+    mask = pd.DataFrame({column: values_differ(stored, new)}, index=rows.index)
+    return Cell_Diff(old, pd.DataFrame({column: new}, index=rows.index), mask)
+
+
+def widened_dtype(current, values):
+    """Return the dtype a column of dtype current needs to hold values, or None if they fit"""
+    if isinstance(current, pd.CategoricalDtype):
+        # New values become new categories, kept sorted so sorting the column still sorts by value
+        added = pd.Index(list(values.dropna().unique()))
+        added = added[~added.isin(current.categories)]
+        if not len(added):
+            return None
+        categories = current.categories.append(added)
+        try:
+            categories = categories.sort_values()
+        except TypeError:
+            pass
+        return pd.CategoricalDtype(categories, ordered=current.ordered)
+
+    new = values.dtype
+    if current == object or new == current:
+        return None
+    try:
+        common = np.result_type(current, new)
+    except TypeError:
+        common = np.dtype(object)
+    return None if common == current else common
+
+
+def widen_column(df, col, values):
+    """Widen a column's dtype in place when the new values cannot be stored in it as is"""
+    common = widened_dtype(df[col].dtype, values)
+    if common is not None:
+        df[col] = df[col].astype(common)
+
+
+def apply_cell_patch(df, diff):
+    """Write only the changed cells of a Cell_Diff into df in place and return the changed cell count"""
+    for col in diff.changed_columns():
+        changed = diff.mask[col].to_numpy()
+        row_ids = diff.mask.index[changed]
+        values = diff.new[col][changed]
+        widen_column(df, col, values)
+        df.iloc[row_positions(df, row_ids), df.columns.get_loc(col)] = values.to_numpy()
+    return diff.cell_count
+
+
+class Edit_Conflict(Exception):
+    """Raised when journalled cells were changed by someone else since they were written"""
+
+
+class Edit_Journal:
+    """Bounded undo/redo history of submitted edits, each kept as a compact cell-level Cell_Diff"""
+
+    def __init__(self, max_entries=50, max_bytes=16 * 2**20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evicted = 0
+        self._undo = deque()
+        self._redo = []
+
+    @property
+    def nbytes(self):
+        return sum(entry["bytes"] for entry in self._undo) + sum(entry["bytes"] for entry in self._redo)
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def record(self, diff, **details):
+        """Add a submitted diff to the history, dropping the redo history and the oldest entries over the caps"""
+        diff = diff.compact()
+        entry = {
+            "diff": diff,
+            "timestamp": time.time(),
+            "rows": len(diff.changed_row_ids),
+            "cells": diff.cell_count,
+            "columns": diff.changed_columns(),
+            "bytes": diff.memory_usage(),
+            **details,
+        }
+        self._undo.append(entry)
+        self._redo.clear()
+        while self._undo and (len(self._undo) > self.max_entries or self.nbytes > self.max_bytes):
+            self._undo.popleft()
+            self.evicted += 1
+        return entry
+
+    def undo(self, store):
+        """Restore the old values of the latest entry in the store and return that entry"""
+        entry = self._undo[-1]
+        self._write(store, entry["diff"].inverted())
+        self._redo.append(self._undo.pop())
+        return entry
+
+    def redo(self, store):
+        """Write the new values of the latest undone entry to the store again and return that entry"""
+        entry = self._redo[-1]
+        self._write(store, entry["diff"])
+        self._undo.append(self._redo.pop())
+        return entry
+
+    def replay(self, store, start=0):
+        """Apply the kept entries from position start onwards to a store, oldest first, and return the cell count"""
+        return sum(store.apply_diff(entry["diff"]) for entry in list(self._undo)[start:])
+
+    def entries(self):
+        """Return the audit trail of kept entries, oldest first, without their cell values"""
+        return [{key: value for key, value in entry.items() if key != "diff"} for entry in self._undo]
+
+    def _write(self, store, diff):
+        # Only write over cells that still hold the values this diff expects to replace
+        current = store.read_row_ids(diff.mask.index.tolist())
+        for col in diff.changed_columns():
+            changed = diff.mask[col].to_numpy()
+            expected = diff.old[col][changed]
+            actual = current[col].to_numpy()[changed]
+            if values_differ(expected, pd.Series(actual, index=expected.index)).any():
+                raise Edit_Conflict(f"Column '{col}' was changed since this edit, it cannot be reverted.")
+        store.apply_diff(diff)
@@ -0,0 +1,125 @@
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+EXPORT_FORMATS = ("csv", "parquet", "xlsx")
+
+# Sheet limit of the xlsx format, header row included
+XLSX_MAX_ROWS = 1_048_576
+
+
+def export_columns(source, columns=None):
+    """Return the columns to export, every column but __row_id__ by default"""
+    return [col for col in (columns or source.columns) if col != "__row_id__"]
+
+
+def iter_chunks(source, columns, chunk_rows):
+    """Yield the rows of a row source in chunks of at most chunk_rows, only one chunk held at a time"""
+    total_rows = source.row_count()
+    for start in range(0, total_rows, chunk_rows):
+        yield source.read_rows(start, min(start + chunk_rows, total_rows))[columns]
+
+
+def schema_frame(source, columns):
+    """Return the empty frame of the exported columns, which gives every file its header"""
+    return source.read_rows(0, 0)[columns]
+
+
+def write_csv(source, columns, chunk_rows, f):
+    # The header comes from the schema, so an export of no rows is still a valid file
+    f.write(schema_frame(source, columns).to_csv(index=False).encode("utf-8"))
+    for chunk in iter_chunks(source, columns, chunk_rows):
+        f.write(chunk.to_csv(index=False, header=False).encode("utf-8"))
+        yield len(chunk)
+
+
+def parquet_schema(source, columns, chunk_rows):
+    """Return the Arrow schema every chunk of a source fits in, from one pass over its rows"""
+    # A column all missing in one chunk and text in a later one would otherwise fail halfway through the file,
+    # so would a source that widens its dtypes mid-file, which is why the pass repeats until the source is stable
+    while True:
+        token = source.cache_token()
+        schemas = [
+            pa.Schema.from_pandas(chunk, preserve_index=False) for chunk in iter_chunks(source, columns, chunk_rows)
+        ]
+        if source.cache_token() == token:
+            break
+    schemas = schemas or [pa.Schema.from_pandas(schema_frame(source, columns), preserve_index=False)]
+    return pa.unify_schemas(schemas, promote_options="permissive")
+
+
+def write_parquet(source, columns, chunk_rows, f):
+    # A Parquet file has one schema, so it is settled before any row is written.
+    # Without rows the schema frame settles it, so an export of no rows is still a readable file.
+    writer = pq.ParquetWriter(f, parquet_schema(source, columns, chunk_rows))
+    try:
+        for chunk in iter_chunks(source, columns, chunk_rows):
+            # Each chunk becomes one row group
+            writer.write_table(pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False))
+            yield len(chunk)
+    finally:
+        writer.close()
+
+
+def write_xlsx(source, columns, chunk_rows, f):
+    try:
+        from openpyxl import Workbook
+    except ImportError as ex:
+        raise ImportError("Exporting to xlsx needs openpyxl, install it with 'pip install openpyxl'.") from ex
+
+    # Write-only workbooks stream rows to a temporary file instead of keeping every cell in memory
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Data")
+    sheet.append([str(col) for col in columns])
+    for chunk in iter_chunks(source, columns, chunk_rows):
+        # Excel has no time zones
+        chunk = chunk.apply(lambda s: s.dt.tz_localize(None) if isinstance(s.dtype, pd.DatetimeTZDtype) else s)
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            sheet.append(row)
+        yield len(chunk)
+    workbook.save(f)
+
+
+EXPORT_WRITERS = {"csv": write_csv, "parquet": write_parquet, "xlsx": write_xlsx}
+
+
+def export_rows(source, fmt, target, columns=None, chunk_rows=100_000, progress=None):
+    """Write every row of a row source to a path or binary file chunk by chunk and return the export stats"""
+    if fmt not in EXPORT_WRITERS:
+        raise ValueError(f"Unsupported export format '{fmt}'. Use one of: {', '.join(EXPORT_FORMATS)}.")
+    total_rows = source.row_count()
+    if fmt == "xlsx" and total_rows >= XLSX_MAX_ROWS:
+        raise ValueError(f"{total_rows:,} rows do not fit in one xlsx sheet, export them as csv or parquet.")
+
+    columns = export_columns(source, columns)
+    started = time.perf_counter()
+    f = open(target, "wb") if isinstance(target, (str, bytes)) or hasattr(target, "__fspath__") else target
+    first_byte = f.tell()
+    rows_written = 0
+    chunks = 0
+    try:
+        for rows in EXPORT_WRITERS[fmt](source, columns, chunk_rows, f):
+            rows_written += rows
+            chunks += 1
+            if progress is not None:
+                # progress(rows written, total rows, bytes written)
+                progress(rows_written, total_rows, f.tell() - first_byte)
+        bytes_written = f.tell() - first_byte
+    finally:
+        if f is not target:
+            f.close()
+
+    stats = {
+        "format": fmt,
+        "rows": rows_written,
+        "columns": len(columns),
+        "chunks": chunks,
+        "bytes": bytes_written,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    if progress is not None:
+        progress(rows_written, total_rows, bytes_written)
+    return stats
@@ -0,0 +1,351 @@
+import io
+import json
+import mmap
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from aggrid_edits import widened_dtype
+from aggrid_store import restore_dtypes
+
+
+class Chunk_Cache:
+    """Bounded LRU cache of decoded file chunks, keyed by chunk index"""
+
+    def __init__(self, max_chunks=8):
+        if max_chunks < 1:
+            raise ValueError("max_chunks must be at least 1.")
+        self.max_chunks = max_chunks
+        self.hits = 0
+        self.misses = 0
+        self._chunks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chunk_index, load, is_current=None):
+        """Return a cached chunk, calling load() outside the lock on a miss and keeping it if still is_current()"""
+        with self._lock:
+            if chunk_index in self._chunks:
+                self._chunks.move_to_end(chunk_index)
+                self.hits += 1
+                return self._chunks[chunk_index]
+            self.misses += 1
+
+        chunk = load()
+        if is_current is not None and not is_current():
+            # Loaded under a schema that has changed since, e.g. by a prefetch thread
+            return chunk
+
+        with self._lock:
+            self._chunks[chunk_index] = chunk
+            self._chunks.move_to_end(chunk_index)
+            while len(self._chunks) > self.max_chunks:
+                self._chunks.popitem(last=False)
+        return chunk
+
+    def clear(self):
+        """Drop every cached chunk"""
+        with self._lock:
+            self._chunks.clear()
+
+
+class Chunked_File_Source:
+    """Row source reading a file one chunk of rows at a time, frames are indexed by global row position"""
+
+    def __init__(self, path, max_cached_chunks=8):
+        self.path = os.path.abspath(path)
+        stat = os.stat(self.path)
+        self._token = (type(self).__name__, self.path, stat.st_mtime_ns, stat.st_size)
+        self.chunks = Chunk_Cache(max_cached_chunks)
+        # Bumped whenever the dtypes served change, which invalidates everything read under the old ones
+        self.schema_generation = 0
+
+    @property
+    def columns(self):
+        return list(self.schema_frame().columns)
+
+    def schema_frame(self):
+        """Return an empty frame with the file's columns and dtypes"""
+        raise NotImplementedError
+
+    def chunk_bounds(self):
+        """Return the first row position of every chunk, followed by the row count"""
+        raise NotImplementedError
+
+    def load_chunk(self, chunk_index):
+        """Read and decode one chunk of rows"""
+        raise NotImplementedError
+
+    def row_count(self):
+        return int(self.chunk_bounds()[-1])
+
+    def get_chunk(self, chunk_index):
+        """Return one chunk of rows through the chunk cache"""
+        generation = self.schema_generation
+
+        def load():
+            bounds = self.chunk_bounds()
+            df = self.load_chunk(chunk_index)
+            df.index = pd.RangeIndex(bounds[chunk_index], bounds[chunk_index] + len(df))
+            return df
+        return self.chunks.get(chunk_index, load, lambda: self.schema_generation == generation)
+
+    def read_rows(self, start, stop):
+        """Return the rows between two positions, reading only the chunks they fall in"""
+        bounds = self.chunk_bounds()
+        stop = min(stop, int(bounds[-1]))
+        if stop <= start:
+            return self.schema_frame()
+
+        first = int(np.searchsorted(bounds, start, side="right")) - 1
+        last = int(np.searchsorted(bounds, stop - 1, side="right")) - 1
+        frames = [self.get_chunk(chunk_index) for chunk_index in range(first, last + 1)]
+        df = pd.concat(frames) if len(frames) > 1 else frames[0]
+        return df.iloc[start - bounds[first]:stop - bounds[first]]
+
+    def take(self, positions):
+        """Return the rows at the given positions, in that order, reading each needed chunk once"""
+        positions = np.asarray(positions, dtype=np.int64)
+        if len(positions) == 0:
+            return self.schema_frame()
+
+        bounds = self.chunk_bounds()
+        chunk_ids = np.searchsorted(bounds, positions, side="right") - 1
+        needed = np.unique(chunk_ids)
+        frames = [self.get_chunk(int(chunk_index)) for chunk_index in needed]
+        combined = pd.concat(frames) if len(frames) > 1 else frames[0]
+
+        # Offset of each needed chunk inside the combined frame
+        offsets = np.concatenate([[0], np.cumsum([len(frame) for frame in frames])[:-1]])
+        slot = np.searchsorted(needed, chunk_ids)
+        return combined.iloc[positions - bounds[chunk_ids] + offsets[slot]]
+
+    def cache_token(self):
+        """Identify the file by path, modification time and size, and the dtypes it is served with"""
+        return self._token + (self.schema_generation,)
+
+
+def with_index_as_columns(table):
+    """Return a table whose stored pandas index columns convert to ordinary columns rather than the index"""
+    meta = table.schema.pandas_metadata
+    if not meta or not any(isinstance(col, str) for col in meta.get("index_columns", [])):
+        return table
+    # Range indexes are not stored as columns, every other index level is data the grid has to show
+    meta = {
+        **meta,
+        "index_columns": [col for col in meta["index_columns"] if not isinstance(col, str)],
+        "columns": [{**col, "name": col["field_name"]} if col["name"] is None else col for col in meta["columns"]],
+    }
+    return table.replace_schema_metadata({**table.schema.metadata, b"pandas": json.dumps(meta).encode()})
+
+
+class Parquet_Source(Chunked_File_Source):
+    """Row source over a memory-mapped Parquet file, one chunk per row group"""
+
+    def __init__(self, path, columns=None, max_cached_chunks=8):
+        super().__init__(path, max_cached_chunks)
+        self.file = pq.ParquetFile(self.path, memory_map=True)
+        # Row count and schema come from the footer metadata, no data is read
+        self.read_columns = columns
+        row_counts = [self.file.metadata.row_group(i).num_rows for i in range(self.file.num_row_groups)]
+        self._bounds = np.concatenate([[0], np.cumsum(row_counts, dtype=np.int64)]).astype(np.int64)
+        self._schema = self.file.schema_arrow.empty_table().select(columns or self.file.schema_arrow.names)
+
+    def schema_frame(self):
+        return with_index_as_columns(self._schema).to_pandas()
+
+    def chunk_bounds(self):
+        return self._bounds
+
+    def load_chunk(self, chunk_index):
+        return with_index_as_columns(self.file.read_row_group(chunk_index, columns=self.read_columns)).to_pandas()
+
+    def read_column(self, col):
+        """Return one full column, reading only that column's pages"""
+        return self.file.read(columns=[col]).column(col).to_pandas()
+
+
+class CSV_Source(Chunked_File_Source):
+    """Row source over a memory-mapped CSV file, indexed by the byte offset of every chunk_rows-th line"""
+
+    def __init__(self, path, chunk_rows=50_000, sep=",", max_cached_chunks=8, scan_block_bytes=64 * 2**20):
+        super().__init__(path, max_cached_chunks)
+        self.chunk_rows = chunk_rows
+        self.sep = sep
+        self.scan_block_bytes = scan_block_bytes
+        self._bounds = None
+        self._offsets = None
+        self._header = None
+        self._data = None
+        self._dtypes = None
+        self._lock = threading.Lock()
+
+    def _map(self):
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _build_index(self):
+        # One pass over the mapped file counting newlines block by block, only chunk starts are kept.
+        # Quoted fields spanning several lines are not supported.
+        data = self._map()
+        size = len(data)
+        chunk_starts = []
+        newline_count = 0
+        for block_start in range(0, size, self.scan_block_bytes):
+            block = np.frombuffer(data, dtype=np.uint8, count=min(self.scan_block_bytes, size - block_start),
+                                  offset=block_start)
+            newlines = np.flatnonzero(block == 10) + block_start
+            # Newline 0 ends the header, data row i starts right after newline i
+            line_numbers = np.arange(newline_count, newline_count + len(newlines))
+            chunk_starts.extend((newlines[line_numbers % self.chunk_rows == 0] + 1).tolist())
+            newline_count += len(newlines)
+            del block
+
+        header_end = chunk_starts[0] if chunk_starts else size
+        row_count = max(newline_count - 1, 0)
+        if size and data[size - 1:size] != b"\n" and newline_count:
+            row_count += 1
+        chunk_count = -(-row_count // self.chunk_rows)
+
+        self._header = bytes(data[:header_end])
+        if not self._header.endswith(b"\n"):
+            self._header += b"\n"
+        self._offsets = chunk_starts[:chunk_count] + [size]
+        self._bounds = np.append(np.arange(chunk_count, dtype=np.int64) * self.chunk_rows, row_count)
+        self._data = data
+
+    def _ensure_index(self):
+        with self._lock:
+            if self._bounds is None:
+                self._build_index()
+
+    def chunk_bounds(self):
+        self._ensure_index()
+        return self._bounds
+
+    def _parse(self, body, **kwargs):
+        return pd.read_csv(io.BytesIO(self._header + body), sep=self.sep, **kwargs)
+
+    def schema_frame(self):
+        self._ensure_index()
+        if self._dtypes is None:
+            # Dtypes start as those of the first chunk and widen when a later chunk holds values they cannot
+            first = self._parse(self._data[self._offsets[0]:self._offsets[1]]) if len(self._offsets) > 1 \
+                else self._parse(b"")
+            self._dtypes = {col: str(dtype) for col, dtype in first.dtypes.items()}
+            for col in first.columns[first.dtypes == object]:
+                # Text columns that fully parse as ISO dates are read as datetimes
+                try:
+                    self._dtypes[col] = str(pd.to_datetime(first[col], format="ISO8601").dtype)
+                except (TypeError, ValueError):
+                    pass
+        return restore_dtypes(self._parse(b""), self._dtypes)
+
+    def _fit_schema(self, df):
+        # Cast a parsed frame to the schema, widening the schema where the cast would change values,
+        # 2.75 in a later chunk of a column that was whole numbers in the first turns the column to floats
+        df = restore_dtypes(df, self._dtypes)
+        widened = {}
+        for col in df.columns:
+            dtype = self._dtypes.get(col)
+            if dtype is None or str(df[col].dtype) == dtype:
+                continue
+            try:
+                common = widened_dtype(np.dtype(dtype), df[col])
+            except TypeError:
+                common = np.dtype(object)
+            if common is not None:
+                widened[col] = str(common)
+        if widened:
+            with self._lock:
+                self._dtypes = {**self._dtypes, **widened}
+                self.schema_generation += 1
+            # Chunks cached so far were cast to the narrower dtypes
+            self.chunks.clear()
+            df = restore_dtypes(df, self._dtypes)
+        return df
+
+    def load_chunk(self, chunk_index):
+        self.schema_frame()
+        body = self._data[self._offsets[chunk_index]:self._offsets[chunk_index + 1]]
+        return self._fit_schema(self._parse(body))
+
+    def read_column(self, col):
+        """Return one full column, parsing only that column of the file"""
+        self.schema_frame()
+        series = pd.read_csv(self.path, sep=self.sep, usecols=[col])
+        return self._fit_schema(series)[col]
+
+
+class Arrow_Source(Chunked_File_Source):
+    """Row source over a memory-mapped Arrow IPC / Feather v2 file, one chunk per record batch"""
+
+    def __init__(self, path, max_cached_chunks=8):
+        super().__init__(path, max_cached_chunks)
+        # Only the footer is read here. Batches are read when their rows are needed: zero-copy from the
+        # memory map for uncompressed files, decompressed one batch at a time for LZ4/ZSTD ones (Feather's default)
+        self.reader = pa.ipc.open_file(pa.memory_map(self.path, "r"))
+        self._schema = self.reader.schema.empty_table()
+        self._bounds = None
+        self._lock = threading.Lock()
+
+    def schema_frame(self):
+        return self._schema.to_pandas()
+
+    def chunk_bounds(self):
+        with self._lock:
+            if self._bounds is None:
+                # The footer does not record batch lengths, so they are counted once, one batch held at a time
+                row_counts = [self.reader.get_batch(i).num_rows for i in range(self.reader.num_record_batches)]
+                self._bounds = np.concatenate([[0], np.cumsum(row_counts, dtype=np.int64)]).astype(np.int64)
+        return self._bounds
+
+    def load_chunk(self, chunk_index):
+        return pa.Table.from_batches([self.reader.get_batch(chunk_index)]).to_pandas()
+
+    def read_column(self, col):
+        """Return one full column, decoding only that column's buffers"""
+        return feather.read_table(self.path, columns=[col], memory_map=True).column(col).to_pandas()
+
+
+FILE_SOURCE_TYPES = {
+    ".parquet": Parquet_Source,
+    ".pq": Parquet_Source,
+    ".csv": CSV_Source,
+    ".arrow": Arrow_Source,
+    ".feather": Arrow_Source,
+    ".ipc": Arrow_Source,
+}
+
+_open_sources = OrderedDict()
+_open_sources_lock = threading.Lock()
+
+
+def open_file_source(path, max_open=8, **kwargs):
+    """Return the process-wide source for a data file, reopened when the file changes on disk"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FILE_SOURCE_TYPES:
+        raise ValueError(f"Unsupported data file '{path}'. Use one of: {', '.join(FILE_SOURCE_TYPES)}.")
+
+    stat = os.stat(path)
+    cache_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, tuple(sorted(kwargs.items())))
+    with _open_sources_lock:
+        if cache_key in _open_sources:
+            _open_sources.move_to_end(cache_key)
+            return _open_sources[cache_key]
+
+    source = FILE_SOURCE_TYPES[extension](path, **kwargs)
+
+    with _open_sources_lock:
+        _open_sources[cache_key] = source
+        _open_sources.move_to_end(cache_key)
+        while len(_open_sources) > max_open:
+            _open_sources.popitem(last=False)
+    return source
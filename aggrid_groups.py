@@ -0,0 +1,155 @@
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+AGGREGATIONS = ("sum", "mean", "count", "min", "max")
+
+
+def group_row_id(group_key):
+    """Return the grid row id of a group row, distinct from every data row id"""
+    return "group:" + json.dumps(list(group_key), default=str)
+
+
+class Group_Result:
+    """Aggregated rows of one grouping of a source, with the source positions of every group's rows"""
+
+    def __init__(self, group_by, aggregations, rows, members, group_of, depends_on):
+        self.group_by = group_by
+        self.aggregations = aggregations
+        # One row per group, indexed by the group key tuple, with a __count__ column of member rows
+        self.rows = rows
+        # {group key: source positions of its rows, in query order}
+        self.members = members
+        # Group number of every source position, -1 where the row is filtered out
+        self.group_of = group_of
+        self.keys = list(rows.index)
+        # Columns whose changes can move rows between groups or reorder them, not just change aggregates
+        self.depends_on = set(depends_on)
+
+
+class Group_Cache:
+    """Cached pandas groupby results of one row source, kept per group key, aggregation spec and query"""
+
+    def __init__(self, source, max_entries=16):
+        self.source = source
+        self.token = source.cache_token()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+        self.refreshed_groups = 0
+        self._results = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _row_ids(self):
+        # Rows are identified by __row_id__, or by the index when it is not materialized
+        if "__row_id__" in self.source.columns:
+            return pd.Index(self.source.read_column("__row_id__").to_numpy())
+        return self.source.read_column(self.source.columns[0]).index
+
+    def _column(self, col, positions):
+        return self.source.read_column(col).iloc[positions].reset_index(drop=True)
+
+    def _aggregate(self, positions, group_by, aggregations):
+        frame = pd.DataFrame({col: self._column(col, positions) for col in dict.fromkeys([*group_by, *aggregations])})
+        grouped = frame.groupby(list(group_by), sort=True, dropna=False, observed=True)
+        rows = grouped.agg(**{col: (col, func) for col, func in aggregations.items()}) if aggregations \
+            else pd.DataFrame(index=grouped.size().index)
+        rows["__count__"] = grouped.size()
+        if len(group_by) == 1:
+            rows.index = pd.Index([(key,) for key in rows.index], tupleize_cols=False)
+        return rows, grouped
+
+    def groups(self, group_by, aggregations, positions=None, query_key=("", ""), query_columns=()):
+        """Return the Group_Result of grouping the rows at positions (every row when None) by group_by"""
+        group_by = tuple(group_by)
+        # Grouping columns are the same across a group, they are shown rather than aggregated
+        aggregations = {col: func for col, func in sorted(aggregations.items()) if col not in group_by}
+        cache_key = (group_by, tuple(aggregations.items()), query_key)
+        with self._lock:
+            if cache_key in self._results:
+                self._results.move_to_end(cache_key)
+                self.hits += 1
+                return self._results[cache_key]
+            self.misses += 1
+
+        if positions is None:
+            positions = np.arange(self.source.row_count())
+        positions = np.asarray(positions, dtype=np.int64)
+        rows, grouped = self._aggregate(positions, group_by, aggregations)
+
+        # Group numbers follow the order of the aggregated rows, a stable sort keeps each group in query order
+        codes = grouped.ngroup().to_numpy()
+        group_of = np.full(self.source.row_count(), -1, dtype=np.int64)
+        group_of[positions] = codes
+        order = np.argsort(codes, kind="stable")
+        bounds = np.cumsum(np.bincount(codes, minlength=len(rows)))[:-1]
+        members = dict(zip(rows.index, np.split(positions[order], bounds)))
+        result = Group_Result(group_by, aggregations, rows, members, group_of, [*group_by, *query_columns])
+
+        with self._lock:
+            self._results[cache_key] = result
+            self._results.move_to_end(cache_key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        return result
+
+    def children(self, result, group_key, limit=None):
+        """Return the rows of one group, read from the source only now that the group is expanded"""
+        positions = result.members[group_key]
+        return self.source.take(positions[:limit] if limit is not None else positions)
+
+    def follow(self, source, changes):
+        """Bring the cache up to date with a source, from the recorded changes that led to its current token"""
+        token = source.cache_token()
+        with self._lock:
+            self.source = source
+            if token == self.token:
+                return
+            # Walk the change log from our token to the current one, any gap means unknown changes
+            steps = []
+            current = self.token
+            for change in changes:
+                if change["before"] == current:
+                    steps.append(change)
+                    current = change["after"]
+            if current != token:
+                self.invalidated += len(self._results)
+                self._results.clear()
+            else:
+                for change in steps:
+                    self.invalidate(change["row_ids"], change["columns"])
+            self.token = token
+
+    def invalidate(self, row_ids, columns):
+        """Drop or refresh the cached results affected by changes to some cells of some rows"""
+        columns = set(columns)
+        with self._lock:
+            if not self._results:
+                return
+            positions = self._row_ids().get_indexer(pd.Index(row_ids))
+            positions = positions[positions >= 0]
+            for cache_key, result in list(self._results.items()):
+                if columns & result.depends_on:
+                    # Rows may have changed group or order, the whole result is recomputed when next needed
+                    del self._results[cache_key]
+                    self.invalidated += 1
+                elif columns & set(result.aggregations):
+                    self._refresh(result, positions)
+
+    def _refresh(self, result, positions):
+        # Only the groups holding a changed row are aggregated again
+        group_numbers = np.unique(result.group_of[positions])
+        for group_number in group_numbers[group_numbers >= 0]:
+            key = result.keys[group_number]
+            rows, _ = self._aggregate(result.members[key], result.group_by, result.aggregations)
+            result.rows.loc[[key], rows.columns] = rows.to_numpy()
+            self.refreshed_groups += 1
+
+    def clear(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._results.clear()
@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aggrid_datasource import detached_source
+
+logger = logging.getLogger("aggrid_classes.loader")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_loader_pool(max_workers=4):
+    """Return the process-wide thread pool running data loads and page prefetches for every session"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="aggrid_loader")
+        return _pool
+
+
+class Background_Load:
+    """One call of a data loader running in the shared thread pool, its result kept until it is replaced"""
+
+    def __init__(self, loader, load_key=None, pool=None):
+        self.loader = loader
+        # Identifies what was asked for, a different load_key starts a new load
+        self.load_key = load_key
+        self.started = time.perf_counter()
+        self.finished = None
+        # The loader runs outside the script thread and must not call Streamlit itself
+        self.future = (pool or get_loader_pool()).submit(self._run)
+
+    def _run(self):
+        try:
+            return self.loader()
+        finally:
+            self.finished = time.perf_counter()
+
+    def done(self):
+        return self.future.done()
+
+    def failed(self):
+        return self.future.done() and not self.future.cancelled() and self.future.exception() is not None
+
+    def result(self):
+        """Return what the loader returned, re-raising its exception if it failed"""
+        return self.future.result()
+
+    def elapsed(self):
+        """Return the seconds the load has been running, or took once done"""
+        return (self.finished or time.perf_counter()) - self.started
+
+    def cancel(self):
+        """Drop the load if it has not started yet, a running loader is left to finish"""
+        return self.future.cancel()
+
+
+class Page_Prefetcher:
+    """Reads the pages around the shown one into a grid's row block cache in the shared thread pool"""
+
+    def __init__(self, max_pending=2, pool=None):
+        self.max_pending = max_pending
+        self.pool = pool
+        self.generation = 0
+        self.prefetched = 0
+        self.cancelled = 0
+        self.failed = 0
+        self._ranges = None
+        self._futures = []
+        self._lock = threading.Lock()
+
+    def schedule(self, block_cache, ranges):
+        """Start fetching (start, stop) row ranges, cancelling what an earlier schedule left unfinished"""
+        ranges = [(start, stop) for start, stop in ranges if stop > start and not block_cache.is_cached(start, stop)]
+        with self._lock:
+            self._futures = [future for future in self._futures if not future.done()]
+            if ranges == self._ranges and self._futures:
+                # Same neighbours as the last rerun, they are still being fetched
+                return
+            # Running fetches see the new generation and stop before their next block,
+            # so they no longer count against max_pending
+            self.generation += 1
+            for future in self._futures:
+                if future.cancel():
+                    self.cancelled += 1
+            self._futures = []
+            self._ranges = ranges
+
+            pool = self.pool or get_loader_pool()
+            # Resolved here on the script thread, session state read from a pool thread is not this session's
+            source = detached_source(block_cache.source)
+            for start, stop in ranges:
+                if len(self._futures) >= self.max_pending:
+                    break
+                future = pool.submit(
+                    self._fetch, block_cache, source, list(block_cache.block_indexes(start, stop)), self.generation
+                )
+                future.add_done_callback(self._log_failure)
+                self._futures.append(future)
+
+    def _fetch(self, block_cache, source, block_indexes, generation):
+        for block_index in block_indexes:
+            if generation != self.generation:
+                return False
+            block_cache.get_block(block_index, source)
+        with self._lock:
+            self.prefetched += 1
+        return True
+
+    def _log_failure(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            self.failed += 1
+            logger.warning("Prefetching rows failed", exc_info=future.exception())
+
+    def pending(self):
+        """Return how many fetches are queued or running"""
+        with self._lock:
+            return sum(not future.done() for future in self._futures)
+
+    def cancel(self):
+        """Cancel every queued fetch and stop the running ones before their next block"""
+        with self._lock:
+            self.generation += 1
+            for future in self._futures:
+                if future.cancel():
+                    self.cancelled += 1
+            self._futures = []
+            self._ranges = None
@@ -0,0 +1,70 @@
+import json
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger("aggrid_classes.timings")
+
+
+class Grid_Timer:
+    """Per-phase timings of grid renders and submits, kept per grid key in a session state mapping"""
+
+    HISTORY_KEY = "__grid_timings__"
+    OPEN_KEY = "__grid_timings_open__"
+
+    def __init__(self, state, history=20):
+        self.state = state
+        self.history_size = history
+
+    def _open_record(self, key):
+        open_records = self.state.setdefault(self.OPEN_KEY, {})
+        if key not in open_records:
+            open_records[key] = {"phases": {}, "started": time.perf_counter()}
+        return open_records[key]
+
+    @contextmanager
+    def phase(self, key, name):
+        """Time one phase of the grid's current render or submit, repeated phases add up"""
+        record = self._open_record(key)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            record["phases"][name] = record["phases"].get(name, 0.0) + elapsed_ms
+
+    def finish(self, key, event, **details):
+        """Close the grid's current record, keep it in the history and return it"""
+        open_record = self.state.setdefault(self.OPEN_KEY, {}).pop(key, None)
+        if open_record is None:
+            open_record = {"phases": {}, "started": time.perf_counter()}
+        phases = {name: round(ms, 3) for name, ms in open_record["phases"].items()}
+        record = {
+            "key": key,
+            "event": event,
+            "timestamp": time.time(),
+            "total_ms": round((time.perf_counter() - open_record["started"]) * 1000, 3),
+            "phases": phases,
+            **details,
+        }
+        history = self.state.setdefault(self.HISTORY_KEY, {})
+        history.setdefault(key, deque(maxlen=self.history_size)).append(record)
+        return record
+
+    def history(self, key=None):
+        """Return the finished records of one grid, or of every grid keyed by grid key, oldest first"""
+        history = self.state.get(self.HISTORY_KEY, {})
+        if key is None:
+            return {grid_key: list(records) for grid_key, records in history.items()}
+        return list(history.get(key, []))
+
+    def latest(self, key):
+        """Return the most recent finished record of a grid, or None"""
+        records = self.state.get(self.HISTORY_KEY, {}).get(key)
+        return records[-1] if records else None
+
+
+def log_timing_record(record):
+    """Write a timing record as one structured JSON log line"""
+    logger.info(json.dumps(record, default=str, separators=(",", ":")))
@@ -0,0 +1,138 @@
+import base64
+import gzip
+import json
+import time
+
+from st_aggrid import JsCode
+
+# Rebuilds row objects from the columnar payload once the grid is ready, and again whenever a rerun
+# replaces the grid options and empties rowData while the grid stays mounted
+COLUMNAR_DECODER_JS = JsCode("""
+function(params) {
+    const payload = params.context && params.context.columnarRowData;
+    if (!payload) {
+        return;
+    }
+    const rowData = params.api.getGridOption('rowData');
+    if (params.type === 'rowDataUpdated' && (!payload.rowCount || (rowData && rowData.length))) {
+        return;
+    }
+    const load = function(text) {
+        const table = JSON.parse(text);
+        const rows = new Array(table.rowCount);
+        for (let i = 0; i < table.rowCount; i++) {
+            const row = {};
+            for (let c = 0; c < table.columns.length; c++) {
+                row[table.columns[c]] = table.data[c][i];
+            }
+            rows[i] = row;
+        }
+        params.api.setGridOption('rowData', rows);
+    };
+    if (payload.encoding === 'gzip+base64') {
+        const bytes = Uint8Array.from(atob(payload.data), function(ch) { return ch.charCodeAt(0); });
+        const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+        new Response(stream).text().then(load);
+    } else {
+        load(payload.data);
+    }
+}
+""")
+
+ROW_ID_JS = JsCode("""
+function(params) {
+    return params.data.__pandas_index;
+}
+""")
+
+# Group rows and the rows of expanded groups are sent as tree data, each row carrying its path
+GROUP_PATH_JS = JsCode("""
+function(data) {
+    return data.__path__;
+}
+""")
+
+# Groups expanded before a rerun stay open when the rows are replaced
+GROUP_OPEN_JS = JsCode("""
+function(params) {
+    const expanded = (params.context && params.context.expandedGroups) || [];
+    return expanded.indexOf(params.rowNode.id) >= 0;
+}
+""")
+
+# Coalesces edits into context.cellChanges, one entry per cell keeping its first old and latest new value.
+# The context goes back to Python with the grid options, so each rerun carries only the pending changes.
+CELL_CHANGE_EVENTS_JS = JsCode("""
+function(params) {
+    const context = params.context;
+    if (!context || !params.colDef.field || params.oldValue === params.newValue) {
+        return;
+    }
+    const changes = context.cellChanges || (context.cellChanges = {});
+    const cellKey = JSON.stringify([params.data.__row_id__, params.colDef.field]);
+    const previous = changes[cellKey];
+    context.cellChangeSeq = (context.cellChangeSeq || 0) + 1;
+    changes[cellKey] = {
+        seq: context.cellChangeSeq,
+        row_id: params.data.__row_id__,
+        col: params.colDef.field,
+        old: previous ? previous.old : params.oldValue,
+        new: params.newValue
+    };
+}
+""")
+
+PAYLOAD_FORMATS = ('rows', 'columnar')
+PAYLOAD_COMPRESSIONS = (None, 'gzip')
+
+
+def encode_columnar(df, row_ids=None, compression=None):
+    """Encode a frame as a columnar JSON payload, optionally gzip-compressed, and return (payload, stats)"""
+    if compression not in PAYLOAD_COMPRESSIONS:
+        raise ValueError(f"Unsupported payload compression '{compression}'. Use None or 'gzip'.")
+
+    started = time.perf_counter()
+    if row_ids is None:
+        row_ids = df["__row_id__"] if "__row_id__" in df.columns else df.index
+
+    columns = [str(col) for col in df.columns] + ["__pandas_index"]
+    # Each column is serialized once, so every name appears once instead of once per row
+    column_texts = [df[col].to_json(orient="values", date_format="iso") for col in df.columns]
+    column_texts.append(json.dumps([str(row_id) for row_id in row_ids], separators=(",", ":")))
+    text = (
+        '{"rowCount":' + str(len(df))
+        + ',"columns":' + json.dumps(columns, separators=(",", ":"))
+        + ',"data":[' + ",".join(column_texts) + "]}"
+    )
+
+    if compression == 'gzip':
+        # A fixed mtime keeps the bytes of an unchanged frame the same, so reruns do not look like new options
+        data = base64.b64encode(gzip.compress(text.encode("utf-8"), compresslevel=6, mtime=0)).decode("ascii")
+        encoding = 'gzip+base64'
+    else:
+        data = text
+        encoding = 'json'
+
+    stats = {
+        "format": "columnar",
+        "compression": compression,
+        "rows": len(df),
+        "columns": len(df.columns),
+        # As sent: the payload is a string inside the grid options JSON, so its quotes get escaped
+        "payload_bytes": len(json.dumps(data)),
+        "row_json_bytes": row_json_size(columns, column_texts, len(df)),
+        "encode_ms": (time.perf_counter() - started) * 1000,
+    }
+    stats["saved_bytes"] = stats["row_json_bytes"] - stats["payload_bytes"]
+    return {"encoding": encoding, "rowCount": len(df), "data": data}, stats
+
+
+def row_json_size(columns, column_texts, row_count):
+    """Return the size the same rows would take as row-oriented JSON records, without building them"""
+    if row_count == 0:
+        return 2
+    # Values are byte-for-byte the same in both layouts, only the framing differs
+    value_bytes = sum(len(text) - 2 - (row_count - 1) for text in column_texts)
+    key_bytes = sum(len(json.dumps(col)) + 1 for col in columns)
+    row_framing = 2 + (len(columns) - 1)
+    return value_bytes + row_count * (key_bytes + row_framing) + (row_count - 1) + 2
@@ -0,0 +1,258 @@
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from aggrid_datasource import detached_source
+
+
+def model_key(model):
+    """Return a stable, hashable key for a grid sort or filter model"""
+    return json.dumps(model, sort_keys=True, default=str) if model else ""
+
+
+def _remember(cache, cache_key, value, max_entries):
+    """Store a value in an OrderedDict used as an LRU cache"""
+    cache[cache_key] = value
+    cache.move_to_end(cache_key)
+    while len(cache) > max_entries:
+        cache.popitem(last=False)
+    return value
+
+
+def set_filter_key(value):
+    """Return the set filter key AG Grid makes of a JSON row value, as JavaScript's String() would"""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float) and value.is_integer():
+        # JSON has one number type, 4.0 arrives in the browser as 4
+        return str(int(value))
+    return str(value)
+
+
+def set_filter_mask(series, values):
+    """Match a column against set filter keys, comparing each value in the form it is sent to the grid in"""
+    codes, uniques = pd.factorize(series)
+    # Only the distinct values are serialized, the same way the grid rows are
+    unique_values = json.loads(pd.Series(uniques).to_json(orient="values", date_format="iso"))
+    wanted = {str(value) for value in values if value is not None}
+    matches = np.array([value is not None and set_filter_key(value) in wanted for value in unique_values] + [False])
+    # Missing values have code -1, which picks the trailing False
+    mask = matches[codes]
+    if None in values:
+        mask |= series.isna().to_numpy()
+    return mask
+
+
+def condition_mask(series, condition):
+    """Evaluate one column's AG Grid filter model entry as a boolean NumPy array"""
+    if condition.get("filterType") == "multi":
+        # agMultiColumnFilter keeps one model per child filter, None where a child is not active
+        masks = [condition_mask(series, model) for model in condition.get("filterModels") or [] if model]
+        return np.logical_and.reduce(masks) if masks else np.ones(len(series), dtype=bool)
+
+    if "conditions" in condition:
+        # Conditions inherit the filter type of the combined model when they do not repeat it
+        filter_type = condition.get("filterType", "text")
+        masks = [
+            condition_mask(series, {"filterType": filter_type, **sub_condition})
+            for sub_condition in condition["conditions"]
+        ]
+        if condition.get("operator", "AND").upper() == "OR":
+            return np.logical_or.reduce(masks)
+        return np.logical_and.reduce(masks)
+
+    filter_type = condition.get("filterType", "text")
+    kind = condition.get("type")
+
+    if filter_type == "set":
+        return set_filter_mask(series, condition.get("values") or [])
+
+    if kind in ("blank", "notBlank"):
+        blank = series.isna() | (series.astype(str).str.strip() == "")
+        mask = blank.to_numpy()
+        return mask if kind == "blank" else ~mask
+
+    if filter_type in ("number", "date"):
+        if filter_type == "number":
+            values = pd.to_numeric(series, errors="coerce")
+            low, high = condition.get("filter"), condition.get("filterTo")
+        else:
+            values = pd.to_datetime(series, errors="coerce")
+            low, high = pd.to_datetime(condition.get("dateFrom")), pd.to_datetime(condition.get("dateTo"))
+        comparisons = {
+            "equals": lambda: values == low,
+            "notEqual": lambda: values != low,
+            "greaterThan": lambda: values > low,
+            "greaterThanOrEqual": lambda: values >= low,
+            "lessThan": lambda: values < low,
+            "lessThanOrEqual": lambda: values <= low,
+            # AG Grid's inRange excludes both ends unless inRangeInclusive is set
+            "inRange": lambda: (values > low) & (values < high),
+        }
+        if kind not in comparisons:
+            raise ValueError(f"Unsupported {filter_type} filter type '{kind}'.")
+        return comparisons[kind]().fillna(False).to_numpy(dtype=bool)
+
+    if filter_type != "text":
+        raise ValueError(f"Unsupported filter '{filter_type}'.")
+
+    text = series.astype("string").str.lower()
+    value = str(condition.get("filter", "")).lower()
+    comparisons = {
+        "contains": lambda: text.str.contains(value, regex=False),
+        "notContains": lambda: ~text.str.contains(value, regex=False),
+        "equals": lambda: text == value,
+        "notEqual": lambda: text != value,
+        "startsWith": lambda: text.str.startswith(value),
+        "endsWith": lambda: text.str.endswith(value),
+    }
+    if kind not in comparisons:
+        raise ValueError(f"Unsupported text filter type '{kind}'.")
+    return comparisons[kind]().fillna(kind in ("notContains", "notEqual")).to_numpy(dtype=bool)
+
+
+class Query_Engine:
+    """Vectorized server-side sort and filter over a row source, with cached permutations and masks"""
+
+    def __init__(self, source, max_entries=64):
+        self.source = source
+        self.token = source.cache_token()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._columns = {}
+        self._sort_keys = {}
+        self._orders = OrderedDict()
+        self._masks = OrderedDict()
+        self._results = OrderedDict()
+        # {(column, filter model key): reason} of filters that could not be evaluated and were left out
+        self.skipped_filters = {}
+        self._lock = threading.RLock()
+
+    def serves(self, source):
+        """Return whether the cached orders and masks are still valid for a source"""
+        return self.token == source.cache_token()
+
+    def column(self, col):
+        """Return a column of the source, read once"""
+        if col not in self._columns:
+            self._columns[col] = self.source.read_column(col)
+        return self._columns[col]
+
+    def sort_key(self, col, ascending=True):
+        """Return integer sort keys for a column, missing values last in both directions"""
+        if col not in self._sort_keys:
+            series = self.column(col)
+            try:
+                codes, uniques = pd.factorize(series, sort=True)
+            except TypeError:
+                # Mixed types cannot be ordered directly, order them by their text instead
+                codes, uniques = pd.factorize(series.astype(str).where(series.notna()), sort=True)
+            self._sort_keys[col] = (codes, len(uniques))
+
+        codes, unique_count = self._sort_keys[col]
+        keys = codes if ascending else unique_count - 1 - codes
+        return np.where(codes < 0, unique_count, keys)
+
+    def column_order(self, col, ascending=True):
+        """Return the cached stable argsort permutation of one column"""
+        cache_key = (col, ascending)
+        with self._lock:
+            if cache_key in self._orders:
+                self._orders.move_to_end(cache_key)
+                return self._orders[cache_key]
+            order = np.argsort(self.sort_key(col, ascending), kind="stable")
+            return _remember(self._orders, cache_key, order, self.max_entries)
+
+    def filter_mask(self, filter_model):
+        """Return the cached boolean row mask of a whole filter model"""
+        columns = self.source.columns
+        mask = np.ones(self.source.row_count(), dtype=bool)
+        with self._lock:
+            for col, condition in filter_model.items():
+                if col not in columns:
+                    continue
+                cache_key = (col, model_key(condition))
+                if cache_key in self.skipped_filters:
+                    continue
+                if cache_key in self._masks:
+                    self._masks.move_to_end(cache_key)
+                    col_mask = self._masks[cache_key]
+                else:
+                    try:
+                        col_mask = condition_mask(self.column(col), condition)
+                    except ValueError as ex:
+                        # A filter the server cannot evaluate is left out rather than failing the render
+                        self.skipped_filters[cache_key] = str(ex)
+                        continue
+                    _remember(self._masks, cache_key, col_mask, self.max_entries)
+                mask &= col_mask
+        return mask
+
+    def positions(self, sort_model=None, filter_model=None):
+        """Return the source row positions matching a filter model, in sort model order"""
+        columns = self.source.columns
+        sort_model = [entry for entry in (sort_model or []) if entry.get("colId") in columns]
+        filter_model = filter_model or {}
+        cache_key = (model_key(sort_model), model_key(filter_model))
+
+        with self._lock:
+            if cache_key in self._results:
+                self._results.move_to_end(cache_key)
+                self.hits += 1
+                return self._results[cache_key]
+            self.misses += 1
+
+            mask = self.filter_mask(filter_model) if filter_model else None
+            if not sort_model:
+                positions = np.arange(self.source.row_count()) if mask is None else np.flatnonzero(mask)
+            elif len(sort_model) == 1:
+                entry = sort_model[0]
+                order = self.column_order(entry["colId"], entry.get("sort", "asc") == "asc")
+                positions = order if mask is None else order[mask[order]]
+            else:
+                positions = np.arange(self.source.row_count()) if mask is None else np.flatnonzero(mask)
+                # lexsort treats the last key as the primary one
+                keys = [
+                    self.sort_key(entry["colId"], entry.get("sort", "asc") == "asc")[positions]
+                    for entry in reversed(sort_model)
+                ]
+                positions = positions[np.lexsort(keys)]
+
+            return _remember(self._results, cache_key, positions, self.max_entries)
+
+    def skipped(self, filter_model):
+        """Return {column: reason} of the filters of a model that were left out"""
+        return {
+            col: self.skipped_filters[(col, model_key(condition))]
+            for col, condition in (filter_model or {}).items()
+            if (col, model_key(condition)) in self.skipped_filters
+        }
+
+
+class Query_Source:
+    """Row source presenting another source's rows filtered and in sorted order"""
+
+    def __init__(self, source, positions, query_key):
+        self.source = source
+        self.positions = positions
+        self.query_key = query_key
+
+    @property
+    def columns(self):
+        return self.source.columns
+
+    def row_count(self):
+        return len(self.positions)
+
+    def read_rows(self, start, stop):
+        return self.source.take(self.positions[start:stop])
+
+    def cache_token(self):
+        return (self.source.cache_token(), self.query_key)
+
+    def detached(self):
+        return Query_Source(detached_source(self.source), self.positions, self.query_key)
@@ -0,0 +1,759 @@
+import copy
+import json
+import queue
+import sqlite3
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from aggrid_edits import (
+    Edit_Conflict, index_by_row_id, row_positions, apply_cell_patch, values_differ, widen_column, widened_dtype
+)
+
+
+class Edit_Store:
+    """Interface for the data behind Edit_Class, every frame returned is indexed by __row_id__"""
+
+    @property
+    def version(self):
+        raise NotImplementedError
+
+    @property
+    def columns(self):
+        return list(self.read_rows(0, 0).columns)
+
+    def is_initialized(self):
+        raise NotImplementedError
+
+    def initialize(self, df):
+        """Load the initial data, df must have a __row_id__ column"""
+        raise NotImplementedError
+
+    def row_count(self):
+        raise NotImplementedError
+
+    def read_rows(self, start, stop):
+        """Return the rows between two positions"""
+        raise NotImplementedError
+
+    def read_row_ids(self, row_ids):
+        """Return the rows with the given __row_id__ values, in that order"""
+        raise NotImplementedError
+
+    def read_frame(self):
+        """Return every row"""
+        raise NotImplementedError
+
+    def read_column(self, col):
+        """Return one full column, in row position order"""
+        raise NotImplementedError
+
+    def take(self, positions):
+        """Return the rows at the given positions, in that order"""
+        row_ids = self.read_column("__row_id__").to_numpy()[positions]
+        return self.read_row_ids(row_ids)
+
+    def apply_diff(self, diff):
+        """Write the changed cells of a Cell_Diff and return the number of cells written"""
+        raise NotImplementedError
+
+    def cache_token(self):
+        """Value that changes whenever the stored data changes, used to invalidate row caches"""
+        raise NotImplementedError
+
+
+class Memory_Store(Edit_Store):
+    """Edit store keeping the whole frame in a per-session state mapping, as Edit_Class always has"""
+
+    def __init__(self, state, key="main_df"):
+        self.state = state
+        self.key = key
+        self.version_key = f"{key}_version"
+
+    @property
+    def version(self):
+        return self.state.get(self.version_key, 0)
+
+    @property
+    def columns(self):
+        return list(self.state[self.key].columns)
+
+    def is_initialized(self):
+        return self.key in self.state
+
+    def initialize(self, df):
+        self.state[self.key] = index_by_row_id(df.copy())
+        self.state[self.version_key] = 0
+
+    def row_count(self):
+        return len(self.state[self.key])
+
+    def read_rows(self, start, stop):
+        return self.state[self.key].iloc[start:stop]
+
+    def read_row_ids(self, row_ids):
+        df = self.state[self.key]
+        return df.iloc[row_positions(df, row_ids)]
+
+    def read_frame(self):
+        return self.state[self.key]
+
+    def read_column(self, col):
+        return self.state[self.key][col]
+
+    def take(self, positions):
+        return self.state[self.key].iloc[positions]
+
+    def apply_diff(self, diff):
+        changed_cells = apply_cell_patch(self.state[self.key], diff)
+        self.state[self.version_key] = self.version + 1
+        return changed_cells
+
+    def cache_token(self):
+        return ("memory", id(self.state[self.key]), self.version)
+
+    def detached(self):
+        """Return a copy reading a snapshot of this store's session state, safe to use off the script thread"""
+        detached = copy.copy(self)
+        detached.state = {key: self.state[key] for key in (self.key, self.version_key) if key in self.state}
+        return detached
+
+
+class Dataset_Lease:
+    """A session's reference to a shared dataset, released when the lease is garbage collected"""
+
+    def __init__(self, registry, name, df):
+        self.name = name
+        self.df = df
+        self._finalizer = weakref.finalize(self, registry.release, name)
+
+    def release(self):
+        """Release the dataset now instead of when the session state is dropped"""
+        self._finalizer()
+
+
+class Dataset_Registry:
+    """Process-wide, reference-counted registry of read-only datasets shared by every session"""
+
+    def __init__(self, max_idle=4):
+        self.max_idle = max_idle
+        self.loads = 0
+        self.evictions = 0
+        self._datasets = {}
+        self._refs = {}
+        # Datasets nobody holds a lease on, least recently released first
+        self._idle = OrderedDict()
+        self._lock = threading.Lock()
+
+    def contains(self, name):
+        with self._lock:
+            return name in self._datasets
+
+    def register(self, name, df):
+        """Add a dataset under a name unless one is already there, and return the shared frame"""
+        with self._lock:
+            if name in self._datasets:
+                return self._datasets[name]
+        # Copied outside the lock and only for a new name, if two sessions race the first registered frame wins
+        shared = index_by_row_id(df.copy())
+        with self._lock:
+            if name not in self._datasets:
+                self._datasets[name] = shared
+                self._refs[name] = 0
+                self._idle[name] = None
+                self.loads += 1
+            return self._datasets[name]
+
+    def acquire(self, name, loader=None):
+        """Return a lease on a dataset, loading it with loader() when it is not registered"""
+        with self._lock:
+            df = self._datasets.get(name)
+        if df is None and loader is not None:
+            # Loaded outside the lock, if two sessions race the first registered frame wins
+            df = index_by_row_id(loader())
+
+        with self._lock:
+            if name not in self._datasets:
+                if df is None:
+                    raise KeyError(f"Dataset '{name}' is not registered and has no loader.")
+                self._datasets[name] = df
+                self._refs[name] = 0
+                self.loads += 1
+            self._refs[name] += 1
+            self._idle.pop(name, None)
+            return Dataset_Lease(self, name, self._datasets[name])
+
+    def release(self, name):
+        """Drop one reference to a dataset, evicting the least recently used idle datasets over max_idle"""
+        with self._lock:
+            if name not in self._refs:
+                return
+            self._refs[name] -= 1
+            if self._refs[name] > 0:
+                return
+            self._idle[name] = None
+            self._idle.move_to_end(name)
+            while len(self._idle) > self.max_idle:
+                evicted, _ = self._idle.popitem(last=False)
+                del self._datasets[evicted]
+                del self._refs[evicted]
+                self.evictions += 1
+
+    def stats(self):
+        """Return the reference count and memory of every registered dataset"""
+        with self._lock:
+            return {
+                name: {"refs": self._refs[name], "bytes": int(df.memory_usage(deep=True).sum())}
+                for name, df in self._datasets.items()
+            }
+
+
+dataset_registry = Dataset_Registry()
+
+
+class Overlay_Store(Edit_Store):
+    """Edit store over a shared registry dataset, this session's changed cells are kept apart and merged on read"""
+
+    def __init__(self, state, name, loader=None, registry=None, key="overlay"):
+        self.state = state
+        self.name = name
+        self.loader = loader
+        self.registry = registry if registry is not None else dataset_registry
+        self.key = f"{key}__{name}"
+        self.lease_key = f"{self.key}__lease"
+        self.cells_key = f"{self.key}__cells"
+        self.version_key = f"{self.key}__version"
+
+    @property
+    def base(self):
+        """The shared frame, never written to"""
+        lease = self.state.get(self.lease_key)
+        if lease is None:
+            lease = self.state[self.lease_key] = self.registry.acquire(self.name, self.loader)
+        return lease.df
+
+    @property
+    def overlay(self):
+        """This session's changed cells, as {column: Series of values indexed by __row_id__}"""
+        if self.cells_key not in self.state:
+            self.state[self.cells_key] = {}
+        return self.state[self.cells_key]
+
+    @property
+    def version(self):
+        return self.state.get(self.version_key, 0)
+
+    @property
+    def columns(self):
+        return list(self.base.columns)
+
+    def overlay_cell_count(self):
+        return sum(len(values) for values in self.overlay.values())
+
+    def is_initialized(self):
+        return self.lease_key in self.state or self.loader is not None or self.registry.contains(self.name)
+
+    def initialize(self, df):
+        self.registry.register(self.name, df)
+        self.state[self.version_key] = 0
+
+    def _merge(self, df):
+        # Copies only when one of the rows has a changed cell
+        merged = None
+        for col, values in self.overlay.items():
+            if col not in df.columns:
+                continue
+            positions = df.index.get_indexer(values.index)
+            found = positions >= 0
+            if not found.any():
+                continue
+            if merged is None:
+                merged = df.copy()
+            widen_column(merged, col, values[found])
+            merged.iloc[positions[found], merged.columns.get_loc(col)] = values[found].to_numpy()
+        return df if merged is None else merged
+
+    def row_count(self):
+        return len(self.base)
+
+    def read_rows(self, start, stop):
+        return self._merge(self.base.iloc[start:stop])
+
+    def read_row_ids(self, row_ids):
+        base = self.base
+        return self._merge(base.iloc[row_positions(base, row_ids)])
+
+    def read_frame(self):
+        return self._merge(self.base)
+
+    def read_column(self, col):
+        return self._merge(self.base[[col]])[col]
+
+    def take(self, positions):
+        return self._merge(self.base.iloc[positions])
+
+    def apply_diff(self, diff):
+        base = self.base
+        overlay = self.overlay
+        for col in diff.changed_columns():
+            changed = diff.mask[col].to_numpy()
+            values = diff.new[col][changed]
+            # Cells set back to their shared value leave the overlay
+            shared = pd.Series(base[col].to_numpy()[row_positions(base, values.index)], index=values.index)
+            values = values[values_differ(shared, values).to_numpy()]
+            previous = overlay.get(col)
+            if previous is not None:
+                kept = previous.drop(diff.mask.index[changed], errors="ignore")
+                values = pd.concat([kept, values]) if len(kept) else values
+            if len(values):
+                overlay[col] = values
+            else:
+                overlay.pop(col, None)
+        self.state[self.version_key] = self.version + 1
+        return diff.cell_count
+
+    def cache_token(self):
+        return ("overlay", self.name, id(self.base), self.version)
+
+    def detached(self):
+        """Return a copy reading a snapshot of this store's session state, safe to use off the script thread"""
+        # Acquires the lease here if this session has none yet
+        self.base
+        detached = copy.copy(self)
+        detached.state = {
+            key: self.state[key] for key in (self.lease_key, self.cells_key, self.version_key) if key in self.state
+        }
+        return detached
+
+
+class Row_Version_Conflict(Edit_Conflict):
+    """Raised when rows were committed by another writer since the versions a submit expected"""
+
+    def __init__(self, row_ids):
+        self.row_ids = row_ids
+        super().__init__(f"{len(row_ids)} row(s) were changed by someone else: {row_ids[:10]}")
+
+
+class Versioned_Store(Edit_Store):
+    """Edit store shared by every session, with a version per row and striped row locks for concurrent submits"""
+
+    def __init__(self, stripes=64):
+        self.stripes = [threading.Lock() for _ in range(stripes)]
+        self._init_lock = threading.Lock()
+        self._version_lock = threading.Lock()
+        self._version = 0
+        self._index = None
+        self._columns = None
+        self._row_versions = None
+
+    @property
+    def version(self):
+        return self._version
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def is_initialized(self):
+        return self._index is not None
+
+    def initialize(self, df):
+        with self._init_lock:
+            if self._index is not None:
+                # Another session loaded the data first
+                return
+            # One array per column, so writers to different rows never restructure a shared frame
+            self._columns = {
+                col: df[col].to_numpy(copy=True) if isinstance(df[col].dtype, np.dtype) else df[col].array.copy()
+                for col in df.columns
+            }
+            self._row_versions = np.zeros(len(df), dtype=np.int64)
+            self._index = pd.Index(df["__row_id__"].to_numpy())
+
+    def _frame(self, positions):
+        return pd.DataFrame(
+            {col: values[positions] for col, values in self._columns.items()},
+            index=self._index[positions]
+        )
+
+    def _positions(self, row_ids):
+        positions = self._index.get_indexer(pd.Index(row_ids))
+        if (positions < 0).any():
+            missing = [row_id for row_id, pos in zip(row_ids, positions) if pos < 0]
+            raise KeyError(f"Unknown __row_id__ value(s): {missing[:10]}")
+        return positions
+
+    def row_count(self):
+        return len(self._index)
+
+    def read_rows(self, start, stop):
+        return self._frame(slice(start, stop))
+
+    def read_row_ids(self, row_ids):
+        return self._frame(self._positions(row_ids))
+
+    def read_frame(self):
+        return self._frame(slice(None))
+
+    def read_column(self, col):
+        return pd.Series(self._columns[col], index=self._index, name=col)
+
+    def take(self, positions):
+        return self._frame(np.asarray(positions, dtype=np.int64))
+
+    def row_versions(self, row_ids):
+        """Return {row_id: version} for rows, to be passed back to apply_diff as the expected versions"""
+        return dict(zip(row_ids, self._row_versions[self._positions(row_ids)].tolist()))
+
+    @contextmanager
+    def _locked(self, positions, every_row=False):
+        # Stripes are always taken in index order, so two submits can never wait on each other in a cycle
+        stripe_ids = range(len(self.stripes)) if every_row else sorted({int(pos) % len(self.stripes) for pos in positions})
+        acquired = []
+        try:
+            for stripe_id in stripe_ids:
+                self.stripes[stripe_id].acquire()
+                acquired.append(stripe_id)
+            yield
+        finally:
+            for stripe_id in reversed(acquired):
+                self.stripes[stripe_id].release()
+
+    def apply_diff(self, diff, expected_versions=None):
+        """Write a Cell_Diff, first checking that its rows are still at the expected versions when given"""
+        row_ids = diff.changed_row_ids
+        positions = self._positions(row_ids)
+        columns = diff.changed_columns()
+        # Widening a column replaces its array, which no other writer may be using meanwhile
+        widen = {
+            col: widened_dtype(self._columns[col].dtype, diff.new[col][diff.mask[col].to_numpy()]) for col in columns
+        }
+        widen = {col: dtype for col, dtype in widen.items() if dtype is not None}
+
+        with self._locked(positions, every_row=bool(widen)):
+            if expected_versions is not None:
+                current = self._row_versions[positions]
+                conflicts = [
+                    row_id for row_id, version in zip(row_ids, current.tolist())
+                    if row_id in expected_versions and expected_versions[row_id] != version
+                ]
+                if conflicts:
+                    raise Row_Version_Conflict(conflicts)
+
+            for col, dtype in widen.items():
+                widened = pd.Series(self._columns[col], copy=False).astype(dtype)
+                self._columns[col] = widened.to_numpy() if isinstance(dtype, np.dtype) else widened.array
+            for col in columns:
+                changed = diff.mask[col].to_numpy()
+                self._columns[col][self._positions(diff.mask.index[changed])] = diff.new[col][changed].to_numpy()
+            self._row_versions[positions] += 1
+
+        with self._version_lock:
+            self._version += 1
+        return diff.cell_count
+
+    def cache_token(self):
+        return ("versioned", id(self), self._version)
+
+
+_versioned_stores = {}
+_versioned_stores_lock = threading.Lock()
+
+
+def get_versioned_store(name, stripes=64):
+    """Return the process-wide versioned store for a dataset name, creating it on first use"""
+    with _versioned_stores_lock:
+        store = _versioned_stores.get(name)
+        if store is None:
+            store = _versioned_stores[name] = Versioned_Store(stripes=stripes)
+        return store
+
+
+def quote_identifier(name):
+    """Quote a table or column name for SQLite"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def to_sql_value(value):
+    """Convert a pandas/NumPy scalar to a value the sqlite3 module can bind"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat(sep=" ")
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def saved_categories(dtype):
+    """Return a categorical dtype as JSON, its categories as values the sqlite3 module stores"""
+    return {"categories": [to_sql_value(value) for value in dtype.categories], "ordered": bool(dtype.ordered)}
+
+
+def recorded_dtype(dtype, categories=None):
+    """Return the dtype recorded as a string, with its saved categories if it is categorical"""
+    if dtype == "category":
+        # Without the saved categories every page would get a category set of only the values it holds
+        return pd.CategoricalDtype(categories["categories"], ordered=categories["ordered"]) if categories else dtype
+    return dtype
+
+
+def restore_dtypes(df, dtypes, categories=None):
+    """Cast columns read back from SQLite to their recorded dtypes wherever that loses nothing"""
+    categories = categories or {}
+    for col, dtype in dtypes.items():
+        if col not in df.columns or str(df[col].dtype) == dtype:
+            continue
+        try:
+            if dtype.startswith("datetime64"):
+                df[col] = pd.to_datetime(df[col])
+                continue
+            restored = df[col].astype(recorded_dtype(dtype, categories.get(col)))
+        except (TypeError, ValueError):
+            # Keep what SQLite returned, e.g. an int column that now holds NULLs
+            continue
+        # 31.5 read back into an int column would become 31, such values keep the dtype SQLite returned
+        if not values_differ(df[col], restored).any():
+            df[col] = restored
+    return df
+
+
+class SQLite_Connection_Pool:
+    """Thread-safe pool of reusable connections to one SQLite database file"""
+
+    def __init__(self, path, size=4, timeout=30.0):
+        self.path = path
+        # Every ':memory:' connection is its own database, so share a single one
+        self.size = 1 if path == ":memory:" else size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        if self.path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with block"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            conn = self._connect() if can_create else self._idle.get(timeout=self.timeout)
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close_all(self):
+        """Close every idle connection"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+_connection_pools = {}
+_connection_pools_lock = threading.Lock()
+
+
+def get_connection_pool(path, size=4):
+    """Return the process-wide connection pool for a database file, creating it on first use"""
+    with _connection_pools_lock:
+        pool = _connection_pools.get(path)
+        if pool is None:
+            pool = _connection_pools[path] = SQLite_Connection_Pool(path, size=size)
+        return pool
+
+
+class SQLite_Store(Edit_Store):
+    """Edit store persisted in a local SQLite table, with paged reads and batched transactional writes"""
+
+    META_TABLE = "__aggrid_meta__"
+
+    def __init__(self, path, table="edit_rows", pool_size=4, batch_size=500):
+        self.path = path
+        self.table = table
+        self.batch_size = batch_size
+        self.pool = get_connection_pool(path, size=pool_size)
+        self._dtypes = None
+        self._categories = None
+
+    def _read_meta(self, conn, name):
+        row = conn.execute(
+            f"SELECT value FROM {quote_identifier(self.META_TABLE)} WHERE name = ?",
+            (f"{self.table}.{name}",)
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def _write_meta(self, conn, name, value):
+        conn.execute(
+            f"INSERT OR REPLACE INTO {quote_identifier(self.META_TABLE)} (name, value) VALUES (?, ?)",
+            (f"{self.table}.{name}", json.dumps(value))
+        )
+
+    def _query(self, sql, params=()):
+        with self.pool.connection() as conn:
+            df = pd.read_sql_query(sql, conn, params=params)
+        return index_by_row_id(restore_dtypes(df, self.dtypes, self.categories))
+
+    @property
+    def dtypes(self):
+        if self._dtypes is None:
+            with self.pool.connection() as conn:
+                self._dtypes = self._read_meta(conn, "dtypes") or {}
+        return self._dtypes
+
+    @property
+    def categories(self):
+        """The saved categories of every categorical column"""
+        if self._categories is None:
+            with self.pool.connection() as conn:
+                self._categories = self._read_meta(conn, "categories") or {}
+        return self._categories
+
+    @property
+    def version(self):
+        with self.pool.connection() as conn:
+            return self._read_meta(conn, "version") or 0
+
+    def _table_exists(self, conn):
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (self.table,)
+        ).fetchone() is not None
+
+    def is_initialized(self):
+        with self.pool.connection() as conn:
+            return self._table_exists(conn)
+
+    def initialize(self, df):
+        table = quote_identifier(self.table)
+        insert = (
+            f"INSERT INTO {table} ({', '.join(quote_identifier(col) for col in df.columns)}) "
+            f"VALUES ({', '.join('?' * len(df.columns))})"
+        )
+        rows = ([to_sql_value(value) for value in row] for row in df.itertuples(index=False, name=None))
+        with self.pool.connection() as conn:
+            with conn:
+                # The write lock is held from the existence check to the last row, so when sessions
+                # initialize the same database at once one creates the table and the others find it
+                conn.execute("BEGIN IMMEDIATE")
+                if self._table_exists(conn):
+                    return
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {quote_identifier(self.META_TABLE)} "
+                    "(name TEXT PRIMARY KEY, value TEXT)"
+                )
+                # DataFrame.to_sql commits on its own, the table is created and filled in this transaction instead
+                conn.execute(pd.io.sql.get_schema(df, self.table))
+                while True:
+                    batch = list(islice(rows, self.batch_size))
+                    if not batch:
+                        break
+                    conn.executemany(insert, batch)
+                conn.execute(
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS {quote_identifier(self.table + '__row_id__')} "
+                    f"ON {table} (__row_id__)"
+                )
+                self._write_meta(conn, "dtypes", {col: str(dtype) for col, dtype in df.dtypes.items()})
+                self._write_meta(conn, "categories", {
+                    col: saved_categories(dtype)
+                    for col, dtype in df.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)
+                })
+                self._write_meta(conn, "version", 0)
+        self._dtypes = None
+        self._categories = None
+
+    def row_count(self):
+        with self.pool.connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {quote_identifier(self.table)}").fetchone()[0]
+
+    def read_rows(self, start, stop):
+        return self._query(
+            f"SELECT * FROM {quote_identifier(self.table)} ORDER BY rowid LIMIT ? OFFSET ?",
+            (max(stop - start, 0), start)
+        )
+
+    def read_row_ids(self, row_ids):
+        row_ids = [to_sql_value(row_id) for row_id in row_ids]
+        chunks = []
+        # Stay below SQLite's bound-parameter limit
+        for offset in range(0, len(row_ids), 900):
+            chunk = row_ids[offset:offset + 900]
+            placeholders = ", ".join("?" * len(chunk))
+            chunks.append(self._query(
+                f"SELECT * FROM {quote_identifier(self.table)} WHERE __row_id__ IN ({placeholders})",
+                chunk
+            ))
+        df = pd.concat(chunks) if chunks else self.read_rows(0, 0)
+        return df.iloc[row_positions(df, row_ids)]
+
+    def read_frame(self):
+        return self._query(f"SELECT * FROM {quote_identifier(self.table)} ORDER BY rowid")
+
+    def read_column(self, col):
+        with self.pool.connection() as conn:
+            df = pd.read_sql_query(
+                f"SELECT {quote_identifier(col)} FROM {quote_identifier(self.table)} ORDER BY rowid", conn
+            )
+        return restore_dtypes(df, self.dtypes, self.categories)[col]
+
+    def apply_diff(self, diff):
+        table = quote_identifier(self.table)
+        with self.pool.connection() as conn:
+            # One transaction for the whole submit, rolled back if any batch fails
+            with conn:
+                # Read afresh, another session may have widened a column since this store cached them
+                dtypes = self._read_meta(conn, "dtypes") or {}
+                categories = self._read_meta(conn, "categories") or {}
+                recorded = (dict(dtypes), dict(categories))
+                for col in diff.changed_columns():
+                    changed = diff.mask[col].to_numpy()
+                    # Values the column's dtype cannot hold widen it, as Memory_Store does
+                    try:
+                        current = recorded_dtype(dtypes[col], categories.get(col))
+                        current = current if isinstance(current, pd.CategoricalDtype) else np.dtype(current)
+                        common = widened_dtype(current, diff.new[col][changed])
+                    except (KeyError, TypeError):
+                        common = None
+                    if isinstance(common, pd.CategoricalDtype):
+                        # New values become new saved categories
+                        categories[col] = saved_categories(common)
+                    elif common is not None:
+                        dtypes[col] = str(common)
+                        categories.pop(col, None)
+                    params = [
+                        (to_sql_value(value), to_sql_value(row_id))
+                        for row_id, value in diff.new[col][changed].items()
+                    ]
+                    sql = f"UPDATE {table} SET {quote_identifier(col)} = ? WHERE __row_id__ = ?"
+                    for offset in range(0, len(params), self.batch_size):
+                        conn.executemany(sql, params[offset:offset + self.batch_size])
+                if dtypes != recorded[0]:
+                    self._write_meta(conn, "dtypes", dtypes)
+                if categories != recorded[1]:
+                    self._write_meta(conn, "categories", categories)
+                self._write_meta(conn, "version", (self._read_meta(conn, "version") or 0) + 1)
+            self._dtypes = dtypes
+            self._categories = categories
+        return diff.cell_count
+
+    def cache_token(self):
+        return ("sqlite", self.path, self.table, self.version)
@@ -1,6 +1,6 @@
 import streamlit as st
 import pandas as pd
-from aggrid_classes import Edit_Class, View_Class  # Import the classes from the main file
+from aggrid_classes import Edit_Class, Grid_Container, View_Class  # Import the classes from the main file
 
 st.set_page_config(layout="wide")
 
@@ -18,17 +18,11 @@ def create_sample_data():
 st.title("🎨 AG-Grid Styling Examples")
 st.markdown("Three different styling approaches for the AG-Grid classes")
 
-# Create tabs for the three examples
-tab1, tab2, tab3 = st.tabs(["🔵 Ocean Blue Theme", "🟢 Forest Green Theme", "🟣 Royal Purple Theme"])
-
-with tab1:
-    st.header("🔵 Ocean Blue Theme Example")
-    st.markdown("*Professional and calm blue styling*")
-    
+def build_blue_viewer():
     # Example 1: Ocean Blue Theme
     sample_data = create_sample_data()
     
-    blue_viewer = View_Class(
+    return View_Class(
         df=sample_data,
         theme='balham',           # Professional theme
         height=500,              # Taller for more rows
@@ -37,6 +31,10 @@ with tab1:
         font_size='15px',        # Slightly smaller font
         font_family='Inter, system-ui, sans-serif'  # Modern font
     )
+
+def render_blue_viewer(blue_viewer):
+    st.header("🔵 Ocean Blue Theme Example")
+    st.markdown("*Professional and calm blue styling*")
     
     blue_viewer.run(
         title="Employee Database - Ocean Theme", 
@@ -46,10 +44,7 @@ with tab1:
     # Show how to customize after creation
     st.info("**Customization Applied:** Deep blue text (#1e3a8a), Inter font, Balham theme, 15 rows per page")
 
-with tab2:
-    st.header("🟢 Forest Green Theme Example")
-    st.markdown("*Natural and fresh green styling*")
-    
+def build_green_viewer():
     # Example 2: Forest Green Theme
     green_data = pd.DataFrame({
         'Project': ['Website Redesign', 'Mobile App', 'Database Migration', 'API Development', 'Testing Suite'] * 6,
@@ -60,7 +55,7 @@ with tab2:
         'Deadline': ['2024-12-01', '2024-11-15', '2024-12-31', '2024-11-30', '2024-12-15'] * 6
     })
     
-    green_viewer = View_Class(
+    return View_Class(
         df=green_data,
         theme='alpine',          # Clean Alpine theme
         height=450,             # Standard height
@@ -69,6 +64,10 @@ with tab2:
         font_size='16px',       # Standard font size
         font_family='Segoe UI, Tahoma, Geneva, Verdana, sans-serif'  # Windows-friendly fonts
     )
+
+def render_green_viewer(green_viewer):
+    st.header("🟢 Forest Green Theme Example")
+    st.markdown("*Natural and fresh green styling*")
     
     green_viewer.run(
         title="Project Management - Forest Theme",
@@ -77,13 +76,8 @@ with tab2:
     
     st.info("**Customization Applied:** Forest green text (#15803d), Segoe UI font family, Alpine theme, 10 rows per page")
 
-with tab3:
-    st.header("🟣 Royal Purple Theme Example")
-    st.markdown("*Elegant and luxurious purple styling*")
-    
+def build_purple_grids():
     # Example 3: Royal Purple Theme with Editable functionality
-    st.subheader("Editable Table with Purple Styling")
-    
     # Create an editable instance with purple theme
     purple_editor = Edit_Class(
         theme='material',        # Material design theme
@@ -94,13 +88,6 @@ with tab3:
         font_family='Georgia, "Times New Roman", serif'  # Elegant serif font
     )
     
-    purple_editor.run()
-    
-    st.info("**Customization Applied:** Royal purple text (#7c3aed), Georgia serif font, Material theme, 8 rows per page")
-    
-    # Additional purple-themed view table
-    st.subheader("Additional Purple View Table")
-    
     luxury_data = pd.DataFrame({
         'Product': ['Diamond Ring', 'Gold Watch', 'Silk Scarf', 'Leather Bag', 'Pearl Necklace'] * 4,
         'Category': ['Jewelry', 'Accessories', 'Fashion', 'Bags', 'Jewelry'] * 4,
@@ -119,11 +106,33 @@ with tab3:
         font_family='Playfair Display, Georgia, serif'  # Luxury serif font
     )
     
+    return purple_editor, luxury_viewer
+
+def render_purple_grids(purple_grids):
+    purple_editor, luxury_viewer = purple_grids
+    st.header("🟣 Royal Purple Theme Example")
+    st.markdown("*Elegant and luxurious purple styling*")
+    
+    st.subheader("Editable Table with Purple Styling")
+    purple_editor.run()
+    
+    st.info("**Customization Applied:** Royal purple text (#7c3aed), Georgia serif font, Material theme, 8 rows per page")
+    
+    # Additional purple-themed view table
+    st.subheader("Additional Purple View Table")
+    
     luxury_viewer.run(
         title="Luxury Products Catalog",
         description="Premium purple theme for high-end product displays"
     )
 
+# Only the selected example is built and rendered, the others are kept for when they are shown again
+examples = Grid_Container("styling_examples")
+examples.add("🔵 Ocean Blue Theme", build_blue_viewer, render=render_blue_viewer)
+examples.add("🟢 Forest Green Theme", build_green_viewer, render=render_green_viewer)
+examples.add("🟣 Royal Purple Theme", build_purple_grids, render=render_purple_grids)
+examples.render()
+
 # Add styling tips section
 st.markdown("---")
 st.header("🎨 Styling Customization Guide")